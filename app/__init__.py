@@ -1,9 +1,13 @@
+import os
+from datetime import date, timedelta
 from pathlib import Path
 
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 import click
 from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.schema import CreateColumn
 
 load_dotenv()
 
@@ -14,6 +18,17 @@ load_dotenv()
 db = SQLAlchemy()
 
 
+def _sqlite_pragmas(wal: bool):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA busy_timeout = 5000")
+        if wal:
+            cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.close()
+
+    return on_connect
+
+
 def create_app(test_config=None):
     # Point Flask to shared template/static directories at repo root
     project_root = Path(__file__).resolve().parent.parent
@@ -27,6 +42,57 @@ def create_app(test_config=None):
         SECRET_KEY="change-me",  # replace with env secret in production
         SQLALCHEMY_DATABASE_URI="sqlite:///hr.db",
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        SSE_HEARTBEAT_SECONDS=15,
+        SSE_BACKLOG_LIMIT=200,  # messages replayed on reconnect, and read per watcher poll
+        SSE_POLL_SECONDS=1.0,  # how often each process checks for posts made in other processes
+        SSE_MAX_STREAM_SECONDS=300,  # streams end after this; browsers reconnect and resume
+        MESSAGE_RETENTION_DAYS=180,
+        MESSAGE_ARCHIVE_BATCH_SIZE=500,
+        MESSAGE_ARCHIVE_PATH=None,  # defaults to <db name>_archive.db next to the database
+        FRAGMENT_CACHE_SIZE=512,  # rendered template fragments kept in memory; 0 disables
+        COMPRESS_ENABLED=True,
+        COMPRESS_LEVEL=6,
+        COMPRESS_BROTLI_QUALITY=4,
+        COMPRESS_MIN_SIZE=1024,  # bytes; smaller buffered bodies are sent as-is
+        COMPRESS_MIMETYPES={"text/html", "application/json", "text/css", "text/plain", "text/csv", "application/javascript"},
+        SQLITE_WAL=True,  # readers no longer block the writer (workers, streams, request threads)
+        JOB_WORKER_CONCURRENCY=2,
+        JOB_POLL_INTERVAL=1.0,
+        JOB_MAX_ATTEMPTS=3,
+        JOB_BACKOFF_SECONDS=10,
+        JOB_BACKOFF_MAX_SECONDS=600,
+        JOB_LEASE_SECONDS=300,  # running jobs whose lease lapses are retried by another worker
+        EXPORT_DIR=str(project_root / "exports"),
+        ATTENDANCE_LATE_AFTER="09:30",  # check-ins after this minute count as late
+        ATTENDANCE_OVERTIME_HOURS=9.0,
+        ATTENDANCE_ABSENCE_STREAK=3,  # consecutive absent logs before a streak is flagged
+        ATTENDANCE_ANOMALY_DAYS=30,  # default look-back for the anomaly report
+        KIOSK_FLUSH_INTERVAL=0.005,  # seconds the kiosk writer waits to fill a batch
+        KIOSK_MAX_BATCH=500,
+        KIOSK_COMMIT_TIMEOUT=5.0,  # seconds a check-in waits for its batch to commit
+        UTILIZATION_HEATMAP_PROJECTS=20,  # most-allocated projects shown as heatmap columns
+        ADMIN_EMAILS={"admin@local"},  # logins allowed into /admin
+        PROFILER_ENABLED=False,
+        PROFILER_SAMPLE_RATE=0.0,  # fraction of requests profiled automatically
+        PROFILER_QUERY_PARAM="_profile",  # admins add ?_profile=1 to profile one request
+        PROFILER_DIR=str(project_root / "profiles"),
+        PROFILER_KEEP=200,  # newest captures kept; older ones are deleted
+        SLOW_QUERY_MS=0,  # log statements slower than this many ms with their plan; 0 disables
+        SLOW_QUERY_LOG=str(project_root / "logs" / "slow_queries.log"),  # rotate externally (logrotate)
+        SLOW_QUERY_LOG_PARAMS=False,  # log bound values, not just their types (they can hold PII)
+        HEALTH_CACHE_SECONDS=5,  # /system/ready checks run at most this often per process
+        HEALTH_MIN_FREE_MB=100,  # below this much free disk the app reports not ready
+        CHAT_BACKEND=os.environ.get("CHAT_BACKEND", "gemini"),  # "stub" answers locally, for load tests
+        CHAT_STUB_LATENCY=0.4,  # seconds the stub backend "thinks" before replying
+        SERVER_BIND="127.0.0.1:5000",  # `flask serve` listen address(es), gunicorn syntax
+        SERVER_WORKERS=0,  # worker processes; 0 means one per CPU core
+        SERVER_THREADS=16,  # request threads per worker (open SSE streams hold one each)
+        SERVER_PRELOAD=True,  # import and build the app once in the master, before forking
+        SERVER_MAX_REQUESTS=1000,  # recycle a worker after this many requests; 0 disables
+        SERVER_MAX_REQUESTS_JITTER=100,  # so workers do not all recycle at once
+        SERVER_KEEPALIVE=5,  # seconds an idle keep-alive connection stays open
+        SERVER_TIMEOUT=30,  # seconds of silence before the master kills a worker
+        SERVER_GRACEFUL_TIMEOUT=30,  # seconds workers get to finish requests on reload/stop
     )
 
     if test_config:
@@ -34,18 +100,82 @@ def create_app(test_config=None):
 
     db.init_app(app)
 
+    with app.app_context():
+        if db.engine.dialect.name == "sqlite":
+            event.listen(db.engine, "connect", _sqlite_pragmas(app.config["SQLITE_WAL"]))
+
     from . import models  # noqa: F401
+    from . import search  # noqa: F401
+    from . import ess  # noqa: F401
+    from . import presence  # noqa: F401
+    from . import recognitions  # noqa: F401
+    from .admin import bp as admin_bp
+    from .api import bp as api_bp
     from .auth import bp as auth_bp
     from .routes import bp as main_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(main_bp)
+    app.register_blueprint(api_bp)
+    app.register_blueprint(admin_bp)
+
+    from .cache import FragmentCacheExtension, LRUCache
+    from .versioning import data_version, ensure_version_table
+
+    ensure_version_table(app)
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    if app.config["FRAGMENT_CACHE_SIZE"]:
+        app.jinja_env.fragment_cache = LRUCache(app.config["FRAGMENT_CACHE_SIZE"])
+    app.jinja_env.globals["data_version"] = data_version
+
+    from .assets import asset_url, build_assets, build_id, load_manifest, serve_asset
+
+    # Building is an explicit `flask build-assets` step; every process only
+    # reads the manifest (and falls back to plain /static URLs without one).
+    app.extensions["asset_manifest"] = load_manifest(app.static_folder)
+    app.extensions["build_id"] = build_id(app, app.extensions["asset_manifest"])
+    app.add_url_rule("/assets/<path:filename>", "assets", serve_asset)
+    app.jinja_env.globals["asset_url"] = asset_url
+
+    from .compression import compress_response
+
+    app.after_request(compress_response)
+
+    from . import profiler, slowlog
+    from .utils import is_admin
+
+    profiler.init_app(app)
+    slowlog.install(app)
+    app.jinja_env.globals["is_admin"] = is_admin
 
     @app.cli.command("init-db")
     def init_db_command():
         """Create database tables."""
+        from .attendance import upgrade_attendance_log
+
         with app.app_context():
             db.create_all()
+            try:
+                upgrade_attendance_log()
+            except RuntimeError as err:
+                raise click.ClickException(str(err))
+            # create_all skips tables that already exist, so add any new nullable
+            # columns and indexes explicitly
+            inspector = db.inspect(db.engine)
+            for table in db.metadata.sorted_tables:
+                existing = {column["name"] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name not in existing and column.nullable:
+                        ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+                        with db.engine.begin() as conn:
+                            conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+                for index in table.indexes:
+                    index.create(db.engine, checkfirst=True)
+            if db.engine.dialect.name == "sqlite":
+                from .archive import upgrade_channel_message
+
+                if upgrade_channel_message():
+                    click.echo("Rebuilt channel_message with AUTOINCREMENT.")
         click.echo("Database initialized.")
 
     @app.cli.command("seed")
@@ -57,4 +187,232 @@ def create_app(test_config=None):
             seed_data()
         click.echo("Database seeded with sample records.")
 
+    @app.cli.command("link-user")
+    @click.argument("email")
+    @click.argument("employee_email")
+    def link_user_command(email, employee_email):
+        """Link a login to an employee record for the self-service portal."""
+        from .models import Employee, User
+
+        with app.app_context():
+            user = User.query.filter_by(email=email.strip().lower()).first()
+            employee = Employee.query.filter(db.func.lower(Employee.email) == employee_email.strip().lower()).first()
+            if user is None or employee is None:
+                raise click.ClickException("Unknown user or employee email.")
+            user.employee_id = employee.id
+            db.session.commit()
+            click.echo(f"{user.email} -> {employee.full_name()}")
+
+    @app.cli.command("create-api-token")
+    @click.argument("email")
+    @click.option("--label", default=None, help="Note to identify the token later.")
+    def create_api_token_command(email, label):
+        """Issue an API token for a user (printed once)."""
+        import secrets
+
+        from .api import hash_token
+        from .models import ApiToken, User
+
+        with app.app_context():
+            user = User.query.filter_by(email=email.strip().lower()).first()
+            if user is None:
+                raise click.ClickException(f"No user with email {email}.")
+            token = secrets.token_urlsafe(32)
+            db.session.add(ApiToken(user_id=user.id, label=label, token_hash=hash_token(token)))
+            db.session.commit()
+        click.echo(token)
+
+    @app.cli.command("worker")
+    @click.option("--concurrency", type=int, default=None, help="Worker threads (per process).")
+    @click.option("--processes", type=int, default=0, help="Run this many worker processes instead of one.")
+    @click.option("--poll-interval", type=float, default=None)
+    @click.option("--drain", is_flag=True, help="Exit once the queue is empty.")
+    def worker_command(concurrency, processes, poll_interval, drain):
+        """Run background jobs from the job table."""
+        from . import jobs
+
+        concurrency = concurrency or app.config["JOB_WORKER_CONCURRENCY"]
+        poll_interval = poll_interval or app.config["JOB_POLL_INTERVAL"]
+        click.echo(f"Worker started ({processes or 1} process(es) x {concurrency} thread(s)): {', '.join(jobs.registered_kinds())}")
+        if processes:
+            jobs.run_worker_processes(processes, concurrency, poll_interval, drain)
+        else:
+            jobs.run_worker(app, concurrency, poll_interval, drain)
+
+    @app.cli.command("build-assets")
+    @click.option("--prune", is_flag=True, help="Delete fingerprints from earlier builds (once no server uses them).")
+    def build_assets_command(prune):
+        """Write fingerprinted, precompressed static assets."""
+        manifest = build_assets(app.static_folder, prune=prune)
+        app.extensions["asset_manifest"] = manifest
+        app.extensions["build_id"] = build_id(app, manifest)
+        for source, hashed in sorted(manifest.items()):
+            click.echo(f"{source} -> {hashed}")
+
+    @app.cli.command("bench-compression")
+    @click.option("--path", "paths", multiple=True, help="Page to render (repeatable).")
+    @click.option("--repeat", type=int, default=20, show_default=True)
+    def bench_compression_command(paths, repeat):
+        """Compare bytes on the wire and CPU cost per compression level."""
+        from .compression import benchmark
+
+        paths = list(paths) or ["/employees", "/payroll", "/attendance", "/projects"]
+        click.echo(f"{'path':<14}{'enc':<6}{'level':>6}{'raw':>10}{'wire':>10}{'ratio':>8}{'ms':>9}")
+        for path, encoding, level, raw, wire, elapsed in benchmark(app, paths, [1, 6, 9], repeat):
+            click.echo(f"{path:<14}{encoding:<6}{level:>6}{raw:>10}{wire:>10}{raw / max(wire, 1):>8.1f}{elapsed:>9.3f}")
+
+    @app.cli.command("bench-kiosk")
+    @click.option("--requests", "total", type=int, default=2000, show_default=True)
+    @click.option("--threads", type=int, default=32, show_default=True, help="Concurrent kiosk clients.")
+    def bench_kiosk_command(total, threads):
+        """Measure sustained kiosk check-ins per second (writes to the configured database)."""
+        from .kiosk import benchmark
+
+        result = benchmark(app, total, threads)
+        click.echo(
+            f"{result['requests']} check-ins in {result['seconds']:.2f}s = {result['per_second']:.0f}/s; "
+            f"{result['batches']} commits (avg batch {result['avg_batch']:.1f}), {result['failures']} failures"
+        )
+
+    @app.cli.command("loadtest")
+    @click.option("--url", default="http://127.0.0.1:5000", show_default=True, help="Running server to drive.")
+    @click.option("--users", default="1,4,16,32", show_default=True, help="Concurrency per stage, comma separated.")
+    @click.option("--duration", type=float, default=20.0, show_default=True, help="Seconds per stage.")
+    @click.option("--mix", default=None, help="Scenario weights, e.g. dashboard=35,payroll=25,checkin=20,chat=10,login=10.")
+    @click.option("--email", default="admin@local", show_default=True)
+    @click.option("--password", default="admin123", show_default=True)
+    @click.option("--think", type=float, default=0.0, help="Mean pause between scenarios, in seconds.")
+    @click.option("--by-request", is_flag=True, help="Also break each stage down per request.")
+    def loadtest_command(url, users, duration, mix, email, password, think, by_request):
+        """Ramp concurrent virtual users against a running server (start it with CHAT_BACKEND=stub)."""
+        from .loadtest import parse_mix, run_stage
+
+        try:
+            weights = parse_mix(mix)
+            stages = [int(value) for value in users.split(",") if value.strip()]
+        except ValueError as err:
+            raise click.BadParameter(str(err))
+        header = f"{'users':>6}{'requests':>10}{'req/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>9}"
+        click.echo(header)
+        for count in stages:
+            try:
+                result = run_stage(url, count, duration, weights, email, password, think)
+            except (OSError, RuntimeError) as err:
+                raise click.ClickException(str(err))
+            click.echo(
+                f"{count:>6}{result['requests']:>10}{result['rps']:>9.1f}{result['p50_ms']:>9.1f}{result['p90_ms']:>9.1f}"
+                f"{result['p99_ms']:>9.1f}{result['max_ms']:>9.1f}{result['error_rate']:>8.1%}"
+            )
+            if by_request:
+                for label, item in result["requests_by_label"].items():
+                    click.echo(
+                        f"{'':>6}  {label:<32}{item['requests']:>7}{item['p50_ms']:>9.1f}{item['p99_ms']:>9.1f}"
+                        f"{item['error_rate']:>8.1%}"
+                    )
+
+    @app.cli.command("serve")
+    @click.option("--bind", "-b", multiple=True, help="Address to listen on (repeatable), e.g. 0.0.0.0:8000.")
+    @click.option("--workers", "-w", type=int, default=None, help="Worker processes (0 = one per CPU core).")
+    @click.option("--threads", type=int, default=None, help="Request threads per worker.")
+    @click.option("--preload/--no-preload", default=None, help="Build the app once before forking workers.")
+    @click.option("--max-requests", type=int, default=None, help="Recycle a worker after this many requests.")
+    @click.option("--max-requests-jitter", type=int, default=None)
+    @click.option("--keep-alive", type=int, default=None, help="Seconds to hold idle keep-alive connections.")
+    @click.option("--timeout", type=int, default=None, help="Seconds before an unresponsive worker is killed.")
+    @click.option("--graceful-timeout", type=int, default=None, help="Seconds workers get to finish on reload/stop.")
+    def serve_command(bind, workers, threads, preload, max_requests, max_requests_jitter, keep_alive, timeout, graceful_timeout):
+        """Run the app under gunicorn (send HUP for a graceful worker reload)."""
+        from .server import serve
+
+        try:
+            serve(
+                app,
+                bind=list(bind) or None,
+                workers=workers,
+                threads=threads,
+                preload_app=preload,
+                max_requests=max_requests,
+                max_requests_jitter=max_requests_jitter,
+                keepalive=keep_alive,
+                timeout=timeout,
+                graceful_timeout=graceful_timeout,
+            )
+        except RuntimeError as err:
+            raise click.ClickException(str(err))
+
+    @app.cli.command("search-reindex")
+    def search_reindex_command():
+        """Rebuild the full-text search index for communications."""
+        from .search import rebuild_index
+
+        with app.app_context():
+            rebuild_index()
+        click.echo("Search index rebuilt.")
+
+    @app.cli.command("archive-messages")
+    @click.option("--days", type=int, default=None, help="Archive messages older than this many days.")
+    @click.option("--batch-size", type=int, default=None, help="Rows moved per transaction.")
+    def archive_messages_command(days, batch_size):
+        """Move old channel messages into the archive database."""
+        from .archive import archive_channel_messages
+
+        with app.app_context():
+            try:
+                moved = archive_channel_messages(days=days, batch_size=batch_size)
+            except RuntimeError as err:
+                raise click.ClickException(str(err))
+        click.echo(f"Archived {moved} channel messages.")
+
+    @app.cli.command("attendance-bitmaps")
+    @click.option("--rebuild", is_flag=True, help="Recompute every bitmap from attendance_log.")
+    def attendance_bitmaps_command(rebuild):
+        """Report (or rebuild) the per-month attendance bitmaps."""
+        from .presence import rebuild_bitmaps, storage_stats
+
+        with app.app_context():
+            if rebuild:
+                rebuild_bitmaps()
+                click.echo("Attendance bitmaps rebuilt.")
+            stats = storage_stats()
+        if stats is None:
+            click.echo("SQLite dbstat is unavailable; cannot measure storage.")
+            return
+        for table, item in stats.items():
+            click.echo(f"{table:<20}{item['rows']:>10} rows{item['bytes']:>14,} bytes")
+
+    @app.cli.command("recognition-leaderboards")
+    @click.option("--rebuild", is_flag=True, help="Recount every tally from the recognition table.")
+    @click.option("--limit", default=5, show_default=True)
+    def recognition_leaderboards_command(rebuild, limit):
+        """Print (or rebuild) the recognition leaderboards."""
+        from .recognitions import leaderboards, rebuild_tally
+
+        with app.app_context():
+            if rebuild:
+                rebuild_tally()
+                click.echo("Recognition tallies rebuilt.")
+            boards = leaderboards(limit)
+        for period, board in boards.items():
+            click.echo(f"{period}:")
+            for row in board["employees"]:
+                click.echo(f"  {row['name']:<30}{row['count']:>6}")
+
+    @app.cli.command("snapshot-metrics")
+    @click.option("--date", "day", type=click.DateTime(formats=["%Y-%m-%d"]), default=None, help="Day to record (default today).")
+    @click.option("--backfill-days", type=int, default=0, help="Also record this many earlier days (counts use current statuses).")
+    @click.option("--schedule", is_flag=True, help="Queue the self-rescheduling daily snapshot job.")
+    def snapshot_metrics_command(day, backfill_days, schedule):
+        """Record daily per-department metrics for the reports trends."""
+        from . import jobs
+        from .metrics import snapshot_metrics
+
+        end = day.date() if day else date.today()
+        with app.app_context():
+            for offset in range(backfill_days, -1, -1):
+                current = end - timedelta(days=offset)
+                click.echo(f"{current}: {snapshot_metrics(current)} department row(s)")
+            if schedule:
+                record = jobs.enqueue("metrics-snapshot", {"repeat": True})
+                click.echo(f"Queued daily snapshot job #{record.id}.")
+
     return app
@@ -1,7 +1,17 @@
+import sys
+
 from . import create_app
+from .server import BaseApplication, serve
 
 app = create_app()
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    if BaseApplication is None:
+        # gunicorn is not installed (it does not run on Windows): fall back to
+        # Werkzeug's threaded server rather than refusing to start.
+        host, _, port = app.config["SERVER_BIND"].rpartition(":")
+        print("gunicorn is not installed; using the Werkzeug development server.", file=sys.stderr)
+        app.run(host=host or "127.0.0.1", port=int(port), threaded=True)
+    else:
+        serve(app)
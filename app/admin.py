@@ -0,0 +1,37 @@
+from flask import Blueprint, abort, current_app, render_template, send_from_directory
+
+from .profiler import list_profiles, load_profile, profile_dir
+from .slowlog import slow_query_report
+from .utils import admin_required
+
+bp = Blueprint("admin", __name__, url_prefix="/admin")
+
+
+@bp.route("/profiles")
+@admin_required
+def profiles():
+    return render_template("admin/profiles.html", profiles=list_profiles())
+
+
+@bp.route("/profiles/<profile_id>")
+@admin_required
+def profile_detail(profile_id: str):
+    profile = load_profile(profile_id) or abort(404)
+    return render_template("admin/profile.html", profile=profile)
+
+
+@bp.route("/profiles/<profile_id>.prof")
+@admin_required
+def profile_download(profile_id: str):
+    load_profile(profile_id) or abort(404)
+    return send_from_directory(profile_dir(), f"{profile_id}.prof", as_attachment=True)
+
+
+@bp.route("/slow-queries")
+@admin_required
+def slow_queries():
+    return render_template(
+        "admin/slow_queries.html",
+        queries=slow_query_report(current_app.config["SLOW_QUERY_LOG"]),
+        threshold=current_app.config["SLOW_QUERY_MS"],
+    )
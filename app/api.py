@@ -0,0 +1,266 @@
+import hashlib
+import math
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from flask import Blueprint, abort, g, jsonify, request
+
+from . import db
+from .models import (
+    ApiToken,
+    Department,
+    Role,
+    Employee,
+    TimeOffRequest,
+    PayrollEntry,
+    Project,
+    ProjectAssignment,
+    AttendanceLog,
+    Announcement,
+    ChannelMessage,
+    PerformanceReview,
+    OnboardingTask,
+    BenefitEnrollment,
+    Recognition,
+)
+from .ess import portal_payload
+from .kiosk import record_check
+from .utilization import department_project_matrix, employee_utilization
+from .utils import conditional_response
+
+bp = Blueprint("api", __name__, url_prefix="/api/v1")
+
+# Logins (emails, linked employees) are deliberately not exposed: any token
+# holder could read them.
+RESOURCES = {
+    "departments": Department,
+    "roles": Role,
+    "employees": Employee,
+    "time-off": TimeOffRequest,
+    "payroll": PayrollEntry,
+    "projects": Project,
+    "project-assignments": ProjectAssignment,
+    "attendance": AttendanceLog,
+    "announcements": Announcement,
+    "channel-messages": ChannelMessage,
+    "performance-reviews": PerformanceReview,
+    "onboarding-tasks": OnboardingTask,
+    "benefit-enrollments": BenefitEnrollment,
+    "recognitions": Recognition,
+}
+
+# Columns that must never leave the server.
+HIDDEN_COLUMNS = {"user": {"password_hash"}}
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+OPERATORS = {
+    "eq": lambda col, value: col == value,
+    "ne": lambda col, value: col != value,
+    "lt": lambda col, value: col < value,
+    "lte": lambda col, value: col <= value,
+    "gt": lambda col, value: col > value,
+    "gte": lambda col, value: col >= value,
+    "in": lambda col, value: col.in_(value),
+}
+
+RESERVED_PARAMS = {"fields", "limit", "after"}
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _error(message: str, status: int):
+    response = jsonify({"error": message})
+    response.status_code = status
+    return response
+
+
+@bp.before_request
+def authenticate():
+    if g.get("user") is not None:
+        return None
+    header = request.headers.get("Authorization", "")
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        api_token = ApiToken.query.filter_by(token_hash=hash_token(token.strip())).first()
+        if api_token is not None:
+            g.user = api_token.user
+            return None
+    return _error("Authentication required.", 401)
+
+
+def visible_columns(model):
+    hidden = HIDDEN_COLUMNS.get(model.__tablename__, set())
+    return {col.name: col for col in model.__table__.columns if col.name not in hidden}
+
+
+def _coerce(column, raw: str):
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return raw
+    if python_type is bool:
+        return raw.lower() in {"1", "true", "yes"}
+    if python_type is date:
+        return date.fromisoformat(raw)
+    if python_type is datetime:
+        return datetime.fromisoformat(raw)
+    if python_type is time:
+        return time.fromisoformat(raw)
+    value = python_type(raw)
+    if python_type in (Decimal, float) and not math.isfinite(value):
+        raise ValueError(f"{raw!r} is not a finite number")
+    return value
+
+
+def to_jsonable(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _select_columns(columns):
+    fields = request.args.get("fields")
+    if not fields:
+        return list(columns.values())
+    selected = []
+    for name in fields.split(","):
+        name = name.strip()
+        if name not in columns:
+            abort(_error(f"Unknown field: {name}", 400))
+        selected.append(columns[name])
+    return selected
+
+
+def _filters(columns):
+    clauses = []
+    for key in request.args:
+        if key in RESERVED_PARAMS:
+            continue
+        name, _, op = key.partition("__")
+        op = op or "eq"
+        if name not in columns or op not in OPERATORS:
+            abort(_error(f"Unsupported filter: {key}", 400))
+        column = columns[name]
+        raw = request.args.get(key)
+        try:
+            value = [_coerce(column, part) for part in raw.split(",")] if op == "in" else _coerce(column, raw)
+        except (TypeError, ValueError, ArithmeticError):  # Decimal raises InvalidOperation
+            abort(_error(f"Invalid value for {key}", 400))
+        clauses.append(OPERATORS[op](column, value))
+    return clauses
+
+
+def _rows_to_dicts(names, rows):
+    # Rows come back as plain tuples from a Core select, so no ORM identity
+    # map or per-object instrumentation is involved.
+    return [{name: to_jsonable(value) for name, value in zip(names, row)} for row in rows]
+
+
+@bp.route("/")
+def index():
+    return jsonify(
+        {
+            "resources": {
+                name: sorted(visible_columns(model)) for name, model in RESOURCES.items()
+            }
+        }
+    )
+
+
+@bp.route("/attendance/check", methods=["POST"])
+def attendance_check():
+    # Kiosk badge swipes: {"employee_id": 12, "action": "in" | "out", "at": optional ISO datetime}.
+    payload = request.get_json(silent=True) or {}
+    try:
+        employee_id = int(payload.get("employee_id"))
+        at = datetime.fromisoformat(payload["at"]) if payload.get("at") else None
+    except (TypeError, ValueError):
+        return _error("employee_id must be an integer and at an ISO datetime.", 400)
+    try:
+        return jsonify({"data": record_check(employee_id, payload.get("action", "in"), at)})
+    except ValueError as err:
+        return _error(str(err), 400)
+    except LookupError as err:
+        return _error(str(err), 404)
+    except TimeoutError as err:
+        return _error(str(err), 503)
+
+
+@bp.route("/utilization")
+def utilization():
+    def render():
+        matrix = department_project_matrix()
+        return jsonify(
+            {
+                "employees": employee_utilization(),
+                "matrix": [
+                    {"department": department, "project_id": project_id, **cell}
+                    for (department, project_id), cell in matrix["cells"].items()
+                ],
+            }
+        )
+
+    return conditional_response(["project_assignment", "project", "employee", "department"], render)
+
+
+@bp.route("/me")
+def me():
+    payload = portal_payload(g.user)
+    if payload is None:
+        return _error("This account is not linked to an employee.", 404)
+
+    def convert(value):
+        if isinstance(value, dict):
+            return {key: convert(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [convert(item) for item in value]
+        return to_jsonable(value)
+
+    return jsonify(convert(payload))
+
+
+@bp.route("/<resource>")
+def list_resource(resource: str):
+    model = RESOURCES.get(resource) or abort(_error(f"Unknown resource: {resource}", 404))
+
+    def render():
+        columns = visible_columns(model)
+        selected = _select_columns(columns)
+        id_column = model.__table__.c.id
+        limit = min(max(request.args.get("limit", DEFAULT_LIMIT, type=int), 1), MAX_LIMIT)
+        after = request.args.get("after", type=int)
+
+        # Always fetch the id for the cursor, even if it was not requested.
+        stmt = db.select(id_column, *selected).where(*_filters(columns)).order_by(id_column).limit(limit + 1)
+        if after is not None:
+            stmt = stmt.where(id_column > after)
+        rows = db.session.execute(stmt).all()
+
+        page = rows[:limit]
+        names = [col.name for col in selected]
+        data = _rows_to_dicts(names, (row[1:] for row in page))
+        next_cursor = page[-1][0] if len(rows) > limit else None
+        return jsonify({"data": data, "next_cursor": next_cursor})
+
+    return conditional_response([model.__tablename__], render)
+
+
+@bp.route("/<resource>/<int:item_id>")
+def get_resource(resource: str, item_id: int):
+    model = RESOURCES.get(resource) or abort(_error(f"Unknown resource: {resource}", 404))
+
+    def render():
+        columns = visible_columns(model)
+        selected = _select_columns(columns)
+        row = db.session.execute(db.select(*selected).where(model.__table__.c.id == item_id)).first()
+        if row is None:
+            return _error("Not found.", 404)
+        return jsonify({"data": _rows_to_dicts([col.name for col in selected], [row])[0]})
+
+    return conditional_response([model.__tablename__], render)
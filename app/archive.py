@@ -0,0 +1,144 @@
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from flask import current_app
+
+from . import db
+from .versioning import bump_tables
+
+_ARCHIVE_DDL = """
+    CREATE TABLE IF NOT EXISTS archive.channel_message (
+        id INTEGER PRIMARY KEY,
+        channel VARCHAR(80) NOT NULL,
+        message TEXT NOT NULL,
+        author VARCHAR(120),
+        created_at DATETIME,
+        archived_at DATETIME
+    )
+"""
+
+_ARCHIVE_INDEX_DDL = """
+    CREATE INDEX IF NOT EXISTS archive.ix_channel_message_channel_created_at
+    ON channel_message (channel, created_at)
+"""
+
+
+def archive_path() -> str:
+    configured = current_app.config.get("MESSAGE_ARCHIVE_PATH")
+    if configured:
+        return configured
+    database = Path(db.engine.url.database)
+    return str(database.with_name(f"{database.stem}_archive{database.suffix or '.db'}"))
+
+
+def _archived_max_id() -> int:
+    path = archive_path()
+    if not os.path.exists(path):
+        return 0
+    with closing(sqlite3.connect(path)) as conn:
+        try:
+            return conn.execute("SELECT max(id) FROM channel_message").fetchone()[0] or 0
+        except sqlite3.OperationalError:  # archive file without the table yet
+            return 0
+
+
+def _has_autoincrement(conn) -> bool:
+    sql = conn.exec_driver_sql(
+        "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = 'channel_message'"
+    ).scalar()
+    return sql is None or "AUTOINCREMENT" in sql.upper()
+
+
+def upgrade_channel_message() -> bool:
+    """Rebuild a channel_message table created without AUTOINCREMENT.
+
+    Without it SQLite hands out max(id) + 1, so once the newest messages are
+    archived their ids would be reused. The rebuilt table's sequence starts
+    above every id in both databases. Returns True if a rebuild was needed.
+    """
+    from .models import ChannelMessage
+    from .search import _FTS_DDL
+
+    with db.engine.begin() as conn:
+        if _has_autoincrement(conn):
+            return False
+        conn.exec_driver_sql("ALTER TABLE channel_message RENAME TO channel_message_old")
+        for index in ChannelMessage.__table__.indexes:
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index.name}")
+        ChannelMessage.__table__.create(conn)
+        conn.exec_driver_sql(
+            "INSERT INTO channel_message (id, channel, message, author, created_at) "
+            "SELECT id, channel, message, author, created_at FROM channel_message_old"
+        )
+        # Dropping the old table drops its triggers too; reinstall the search ones.
+        conn.exec_driver_sql("DROP TABLE channel_message_old")
+        for ddl in _FTS_DDL:
+            conn.exec_driver_sql(ddl)
+        floor = max(conn.exec_driver_sql("SELECT coalesce(max(id), 0) FROM channel_message").scalar(), _archived_max_id())
+        conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'channel_message'")
+        conn.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES ('channel_message', ?)", (floor,))
+    return True
+
+
+def archive_channel_messages(days: Optional[int] = None, batch_size: Optional[int] = None) -> int:
+    """Move channel messages older than ``days`` into the attached archive database.
+
+    Rows move in batches of ``batch_size``, one short transaction per batch, so
+    writers are never blocked for long. Archived rows keep their search index
+    entries and remain searchable.
+    """
+    days = days if days is not None else current_app.config["MESSAGE_RETENTION_DAYS"]
+    batch_size = batch_size or current_app.config["MESSAGE_ARCHIVE_BATCH_SIZE"]
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    moved = 0
+
+    with db.engine.connect() as conn:
+        if not _has_autoincrement(conn):
+            raise RuntimeError("channel_message predates archival and could reuse archived ids; run `flask init-db` first.")
+        conn.rollback()
+        conn.exec_driver_sql("ATTACH DATABASE ? AS archive", (archive_path(),))
+        try:
+            conn.exec_driver_sql(_ARCHIVE_DDL)
+            conn.exec_driver_sql(_ARCHIVE_INDEX_DDL)
+            conn.commit()
+
+            channels = [row[0] for row in conn.exec_driver_sql("SELECT DISTINCT channel FROM main.channel_message")]
+            for channel in channels:
+                while True:
+                    # Walks the (channel, created_at) index instead of scanning the table.
+                    ids = [
+                        row[0]
+                        for row in conn.exec_driver_sql(
+                            "SELECT id FROM main.channel_message WHERE channel = ? AND created_at < ? "
+                            "ORDER BY created_at LIMIT ?",
+                            (channel, cutoff.isoformat(sep=" "), batch_size),
+                        )
+                    ]
+                    if not ids:
+                        break
+                    marks = ",".join("?" * len(ids))
+                    # Plain INSERT: an id already in the archive is a bug and must fail loudly.
+                    conn.exec_driver_sql(
+                        "INSERT INTO archive.channel_message "
+                        "(id, channel, message, author, created_at, archived_at) "
+                        f"SELECT id, channel, message, author, created_at, ? FROM main.channel_message WHERE id IN ({marks})",
+                        (datetime.utcnow().isoformat(sep=" "), *ids),
+                    )
+                    conn.exec_driver_sql(f"DELETE FROM main.channel_message WHERE id IN ({marks})", tuple(ids))
+                    # The delete trigger drops the FTS rows; put them back so search still finds them.
+                    conn.exec_driver_sql(
+                        "INSERT INTO channel_message_fts (rowid, message, channel, author, created_at) "
+                        f"SELECT id, message, channel, author, created_at FROM archive.channel_message WHERE id IN ({marks})",
+                        tuple(ids),
+                    )
+                    bump_tables(conn, ["channel_message"])
+                    conn.commit()
+                    moved += len(ids)
+        finally:
+            conn.rollback()
+            conn.exec_driver_sql("DETACH DATABASE archive")
+    return moved
@@ -0,0 +1,108 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+from pathlib import Path
+from typing import Dict
+
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # optional: .br variants are skipped without it
+    brotli = None
+
+DIST_DIR = "dist"
+MANIFEST = "manifest.json"
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".html"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def build_assets(static_folder: str, prune: bool = False) -> Dict[str, str]:
+    """Write content-hashed copies (plus .gz/.br) of every static file into static/dist.
+
+    Earlier fingerprints are kept unless ``prune`` is set, so servers still
+    running the previous manifest keep serving the files it names.
+    """
+    root = Path(static_folder)
+    dist = root / DIST_DIR
+    dist.mkdir(exist_ok=True)
+    manifest = {}
+
+    for source in sorted(root.rglob("*")):
+        if not source.is_file() or dist in source.parents:
+            continue
+        data = source.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        relative = source.relative_to(root)
+        hashed = relative.with_name(f"{relative.stem}.{digest}{relative.suffix}")
+        target = dist / hashed
+        manifest[relative.as_posix()] = hashed.as_posix()
+        if target.exists():
+            continue
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        if source.suffix in COMPRESSIBLE:
+            target.with_name(target.name + ".gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                target.with_name(target.name + ".br").write_bytes(brotli.compress(data, quality=11))
+
+    if prune:
+        current = {MANIFEST} | {hashed + suffix for hashed in manifest.values() for suffix in ("", ".gz", ".br")}
+        for stale in dist.rglob("*"):
+            if stale.is_file() and stale.relative_to(dist).as_posix() not in current:
+                stale.unlink()
+
+    # Replace the manifest atomically so a starting process never reads half of it.
+    staging = dist / (MANIFEST + ".tmp")
+    staging.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    staging.replace(dist / MANIFEST)
+    return manifest
+
+
+def load_manifest(static_folder: str) -> Dict[str, str]:
+    path = Path(static_folder) / DIST_DIR / MANIFEST
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def build_id(app, manifest: Dict[str, str]) -> str:
+    """Identify the deployed build: the asset manifest, templates and app code.
+
+    Folded into page ETags so HTML cached under an older build is re-rendered
+    instead of revalidated against fingerprints that may be gone.
+    """
+    digest = hashlib.sha1(json.dumps(manifest, sort_keys=True).encode())
+    sources = sorted(Path(app.template_folder).rglob("*.html")) + sorted(Path(app.root_path).rglob("*.py"))
+    for source in sources:
+        digest.update(source.as_posix().encode())
+        digest.update(source.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def asset_url(filename: str) -> str:
+    """Fingerprinted URL for a static file, falling back to the plain static route."""
+    hashed = current_app.extensions.get("asset_manifest", {}).get(filename)
+    if hashed is None:
+        return url_for("static", filename=filename)
+    return url_for("assets", filename=hashed)
+
+
+def serve_asset(filename: str):
+    dist = Path(current_app.static_folder) / DIST_DIR
+    accepted = request.accept_encodings
+    encoding, served = None, filename
+    for candidate, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if accepted[candidate] and (dist / (filename + suffix)).is_file():
+            encoding, served = candidate, filename + suffix
+            break
+
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    response = send_from_directory(dist, served, mimetype=mimetype, max_age=31536000)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = IMMUTABLE
+    return response
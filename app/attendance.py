@@ -0,0 +1,166 @@
+import threading
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import text
+
+from . import db
+from .versioning import data_version
+
+# One ordered pass over attendance_log per employee (served by the
+# (employee_id, work_date) index, so no sort step). The running count of
+# non-absent days stays constant across a run of absences, so it doubles as a
+# streak id and a single window function is enough; the rest is grouping.
+_ANOMALY_SQL = text(
+    """
+    WITH flagged AS (
+        SELECT
+            employee_id,
+            CASE WHEN check_in > :late_after THEN 1 ELSE 0 END AS late,
+            CASE WHEN check_in IS NOT NULL AND check_out IS NULL AND work_date < :today
+                 THEN 1 ELSE 0 END AS missing_checkout,
+            CASE WHEN (julianday(check_out) - julianday(check_in)) * 24 > :overtime_hours
+                 THEN 1 ELSE 0 END AS overtime,
+            CASE WHEN status = 'absent' THEN 1 ELSE 0 END AS absent,
+            SUM(CASE WHEN status = 'absent' THEN 0 ELSE 1 END) OVER (
+                PARTITION BY employee_id ORDER BY work_date, id ROWS UNBOUNDED PRECEDING
+            ) AS streak
+        FROM attendance_log
+        WHERE work_date BETWEEN :start AND :end
+    ),
+    streaks AS (
+        SELECT employee_id, MAX(length) AS longest_absence
+        FROM (
+            SELECT employee_id, streak, COUNT(*) AS length
+            FROM flagged
+            WHERE absent = 1
+            GROUP BY employee_id, streak
+        )
+        GROUP BY employee_id
+    ),
+    totals AS (
+        SELECT
+            employee_id,
+            COUNT(*) AS days,
+            SUM(late) AS late,
+            SUM(missing_checkout) AS missing_checkout,
+            SUM(overtime) AS overtime,
+            SUM(absent) AS absent
+        FROM flagged
+        GROUP BY employee_id
+    )
+    SELECT
+        e.id AS employee_id,
+        TRIM(e.first_name || ' ' || COALESCE(e.last_name, '')) AS name,
+        t.days,
+        t.late,
+        t.missing_checkout,
+        t.overtime,
+        t.absent,
+        COALESCE(s.longest_absence, 0) AS longest_absence
+    FROM totals t
+    JOIN employee e ON e.id = t.employee_id
+    LEFT JOIN streaks s ON s.employee_id = t.employee_id
+    WHERE t.late > 0 OR t.missing_checkout > 0 OR t.overtime > 0
+       OR COALESCE(s.longest_absence, 0) >= :absence_streak
+    ORDER BY t.late + t.missing_checkout + t.overtime + COALESCE(s.longest_absence, 0) DESC, name
+    LIMIT :limit
+    """
+)
+
+
+def anomaly_thresholds() -> Dict[str, object]:
+    config = current_app.config
+    return {
+        "late_after": config["ATTENDANCE_LATE_AFTER"],
+        "overtime_hours": config["ATTENDANCE_OVERTIME_HOURS"],
+        "absence_streak": config["ATTENDANCE_ABSENCE_STREAK"],
+    }
+
+
+def attendance_anomalies(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = 200,
+    **thresholds,
+) -> List[Dict[str, object]]:
+    """Per-employee late arrivals, missing check-outs, overtime days and absence streaks.
+
+    ``thresholds`` override the ATTENDANCE_* config values (late_after as
+    "HH:MM", overtime_hours, absence_streak).
+    """
+    end = end or date.today()
+    start = start or end - timedelta(days=current_app.config["ATTENDANCE_ANOMALY_DAYS"])
+    params = {**anomaly_thresholds(), **thresholds}
+    late_after = params["late_after"]
+    if len(late_after) == 5:
+        late_after += ":59.999999"  # check_in is stored as HH:MM:SS.ffffff
+    rows = db.session.execute(
+        _ANOMALY_SQL,
+        {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "today": date.today().isoformat(),
+            "late_after": late_after,
+            "overtime_hours": float(params["overtime_hours"]),
+            "absence_streak": int(params["absence_streak"]),
+            "limit": limit,
+        },
+    )
+    return [dict(row._mapping) for row in rows]
+
+
+def _refresh_dashboard(app, state: Dict[str, object], key: tuple) -> None:
+    try:
+        with app.app_context():
+            rows = attendance_anomalies(limit=5)
+    except Exception:
+        app.logger.exception("Dashboard anomaly refresh failed")
+        rows = None
+    with state["lock"]:
+        if rows is not None:
+            state["key"], state["rows"] = key, rows
+        state["refreshing"] = False
+
+
+def dashboard_anomalies() -> Tuple[Optional[List[Dict[str, object]]], bool]:
+    """Top five anomalies for the dashboard, as ``(rows, fresh)``, without waiting on the scan.
+
+    After attendance or employees change, the previous rows are returned at
+    once (``fresh`` False) while one background thread recomputes them;
+    ``rows`` is None until the first computation in this process finishes.
+    """
+    app = current_app._get_current_object()
+    state = app.extensions.setdefault(
+        "dashboard_anomalies", {"lock": threading.Lock(), "key": None, "rows": None, "refreshing": False}
+    )
+    key = (data_version("attendance_log", "employee"), date.today())
+    with state["lock"]:
+        if state["key"] == key:
+            return state["rows"], True
+        if not state["refreshing"]:
+            state["refreshing"] = True
+            threading.Thread(
+                target=_refresh_dashboard, args=(app, state, key), name="anomaly-refresh", daemon=True
+            ).start()
+        return state["rows"], False
+
+
+def upgrade_attendance_log() -> None:
+    """Prepare an existing attendance_log for the unique per-day index.
+
+    Drops the older non-unique index on the same columns and refuses to go on
+    while an employee has two logs for one day; those need merging by hand.
+    """
+    with db.engine.begin() as conn:
+        duplicates = conn.execute(
+            text(
+                "SELECT employee_id, work_date FROM attendance_log "
+                "GROUP BY employee_id, work_date HAVING COUNT(*) > 1 LIMIT 5"
+            )
+        ).all()
+        if duplicates:
+            listed = ", ".join(f"employee {row.employee_id} on {row.work_date}" for row in duplicates)
+            raise RuntimeError(f"attendance_log has more than one log per day ({listed}); merge them and rerun init-db.")
+        conn.execute(text("DROP INDEX IF EXISTS ix_attendance_log_employee_work_date"))
@@ -1,5 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash
 
+from . import db
+from .ess import link_by_email
 from .models import User
 from .utils import load_current_user
 
@@ -19,6 +21,8 @@ def login():
         user = User.query.filter_by(email=email).first()
 
         if user and user.check_password(password):
+            if user.employee_id is None and link_by_email(user) is not None:
+                db.session.commit()
             session.clear()
             session["user_id"] = user.id
             flash("Welcome back!", "success")
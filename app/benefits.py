@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import aliased
+
+from . import db
+from .models import BenefitEnrollment
+
+ROLLUPS = ("benefit_type", "provider", "coverage")
+
+
+def covered_on(as_of: date):
+    """Enrollments in force on ``as_of``: started, not yet ended, and not pending.
+
+    Missing dates mean open-ended. The range terms are written as ORs rather
+    than COALESCE so SQLite can still walk the (start_date, end_date) and
+    (end_date, start_date) indexes.
+    """
+    return db.and_(
+        BenefitEnrollment.status != "pending",
+        db.or_(BenefitEnrollment.start_date <= as_of, BenefitEnrollment.start_date.is_(None)),
+        db.or_(
+            BenefitEnrollment.end_date >= as_of,
+            db.and_(BenefitEnrollment.end_date.is_(None), BenefitEnrollment.status != "ended"),
+        ),
+    )
+
+
+def coverage_as_of(as_of: date, employee_id: Optional[int] = None) -> List[BenefitEnrollment]:
+    query = BenefitEnrollment.query.options(db.joinedload(BenefitEnrollment.employee)).filter(covered_on(as_of))
+    if employee_id is not None:
+        query = query.filter(BenefitEnrollment.employee_id == employee_id)
+    return query.order_by(BenefitEnrollment.benefit_type, BenefitEnrollment.start_date.desc().nullslast()).all()
+
+
+def coverage_rollup(as_of: date, by: str = "benefit_type") -> List[Dict[str, Any]]:
+    """Enrollments and distinct employees covered on ``as_of`` per benefit type, provider or coverage."""
+    if by not in ROLLUPS:
+        raise ValueError(f"by must be one of {', '.join(ROLLUPS)}")
+    group = db.func.coalesce(db.func.nullif(getattr(BenefitEnrollment, by), ""), "Unspecified")
+    rows = db.session.execute(
+        db.select(
+            group.label("name"),
+            db.func.count().label("enrollments"),
+            db.func.count(db.distinct(BenefitEnrollment.employee_id)).label("employees"),
+        )
+        .where(covered_on(as_of))
+        .group_by(group)
+        .order_by(db.func.count().desc(), group)
+    ).all()
+    return [{"name": row.name, "enrollments": row.enrollments, "employees": row.employees} for row in rows]
+
+
+def renew_enrollments(period_end: date, new_end: date, benefit_type: Optional[str] = None) -> int:
+    """Open enrollment: roll every active enrollment ending on ``period_end`` forward.
+
+    One INSERT ... SELECT adds the next period (the day after ``period_end``
+    through ``new_end``) with the same benefit, provider and coverage. The old
+    rows stay as history for as-of queries, and enrollments already renewed
+    are skipped, so running it twice is harmless.
+    """
+    new_start = period_end + timedelta(days=1)
+    renewed = aliased(BenefitEnrollment)
+    existing = (
+        db.select(renewed.id)
+        .where(
+            renewed.employee_id == BenefitEnrollment.employee_id,
+            renewed.benefit_type == BenefitEnrollment.benefit_type,
+            renewed.start_date == new_start,
+        )
+        .exists()
+    )
+    source = db.select(
+        BenefitEnrollment.employee_id,
+        BenefitEnrollment.benefit_type,
+        BenefitEnrollment.provider,
+        BenefitEnrollment.coverage,
+        db.literal("active"),
+        db.literal(new_start, db.Date),
+        db.literal(new_end, db.Date),
+    ).where(BenefitEnrollment.status == "active", BenefitEnrollment.end_date == period_end, ~existing)
+    if benefit_type:
+        source = source.where(BenefitEnrollment.benefit_type == benefit_type)
+    result = db.session.execute(
+        db.insert(BenefitEnrollment).from_select(
+            ["employee_id", "benefit_type", "provider", "coverage", "status", "start_date", "end_date"], source
+        )
+    )
+    db.session.commit()
+    return result.rowcount
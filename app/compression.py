@@ -0,0 +1,119 @@
+import time
+import zlib
+from typing import Iterable, Iterator, List, Optional
+
+from flask import current_app, request
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    import brotli
+except ImportError:  # optional: falls back to gzip only
+    brotli = None
+
+SKIP_MIMETYPES = {"text/event-stream"}
+
+
+def _negotiate() -> Optional[str]:
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def _gzip_stream(chunks: Iterable[bytes], level: int) -> Iterator[bytes]:
+    # Sync-flush after each chunk so generator responses still stream.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _brotli_stream(chunks: Iterable[bytes], quality: int) -> Iterator[bytes]:
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def compress_body(data: bytes, encoding: str, level: int, quality: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=quality)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_response(response):
+    """after_request hook compressing dynamic HTML/JSON per Accept-Encoding."""
+    config = current_app.config
+    if not config["COMPRESS_ENABLED"]:
+        return response
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return response
+    if response.direct_passthrough or "Content-Encoding" in response.headers:
+        return response
+    mimetype = response.mimetype or ""
+    if mimetype in SKIP_MIMETYPES or mimetype not in config["COMPRESS_MIMETYPES"]:
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = _negotiate()
+    if encoding is None:
+        return response
+
+    level = config["COMPRESS_LEVEL"]
+    quality = config["COMPRESS_BROTLI_QUALITY"]
+    if response.is_streamed:
+        chunks = response.response
+        stream = _brotli_stream(chunks, quality) if encoding == "br" else _gzip_stream(chunks, level)
+        # Forward close() so the wrapped generator's cleanup still runs on disconnect.
+        response.response = ClosingIterator(stream, getattr(chunks, "close", None))
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < config["COMPRESS_MIN_SIZE"]:
+            return response
+        response.set_data(compress_body(data, encoding, level, quality))
+
+    response.headers["Content-Encoding"] = encoding
+    # The compressed bytes are a different representation, so validators become weak.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def benchmark(app, paths: List[str], levels: List[int], repeat: int = 20):
+    """Render ``paths`` once and time each encoding/level over the same bytes."""
+    from .models import User
+
+    client = app.test_client()
+    with app.app_context():
+        user = User.query.first()
+    if user is not None:
+        with client.session_transaction() as session:
+            session["user_id"] = user.id
+
+    rows = []
+    for path in paths:
+        response = client.get(path, headers={"Accept-Encoding": "identity"})
+        body = response.get_data()
+        variants = [("gzip", level) for level in levels]
+        if brotli is not None:
+            variants += [("br", quality) for quality in (1, 4, 11)]
+        for encoding, level in variants:
+            started = time.perf_counter()
+            for _ in range(repeat):
+                compressed = compress_body(body, encoding, level, level)
+            elapsed_ms = (time.perf_counter() - started) * 1000 / repeat
+            rows.append((path, encoding, level, len(body), len(compressed), elapsed_ms))
+    return rows
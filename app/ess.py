@@ -0,0 +1,169 @@
+from datetime import date
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+
+from . import db
+from .cache import LRUCache
+from .models import Employee, EmployeeDataVersion, OnboardingTask, PayrollEntry, Recognition, TimeOffRequest, User
+from .versioning import data_version
+
+# Tables whose rows belong to one employee and appear on that employee's
+# portal. Any write to them bumps employee_data_version for the employee(s)
+# involved, so the cached payload below is only rebuilt for those people.
+SCOPED_TABLES = ("onboarding_task", "time_off_request", "payroll_entry", "recognition")
+
+_BUMP = """
+        INSERT INTO employee_data_version (employee_id, version) VALUES ({employee}, 1)
+        ON CONFLICT (employee_id) DO UPDATE SET version = version + 1;"""
+
+
+def _triggers():
+    for table in SCOPED_TABLES:
+        yield f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_ess_ai AFTER INSERT ON {table} BEGIN
+            {_BUMP.format(employee="new.employee_id")}
+        END
+        """
+        yield f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_ess_ad AFTER DELETE ON {table} BEGIN
+            {_BUMP.format(employee="old.employee_id")}
+        END
+        """
+        yield f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_ess_au AFTER UPDATE ON {table} BEGIN
+            {_BUMP.format(employee="old.employee_id")}
+            {_BUMP.format(employee="new.employee_id")}
+        END
+        """
+    yield f"""
+    CREATE TRIGGER IF NOT EXISTS employee_ess_au AFTER UPDATE ON employee BEGIN
+        {_BUMP.format(employee="new.id")}
+    END
+    """
+    yield f"""
+    CREATE TRIGGER IF NOT EXISTS employee_ess_ad AFTER DELETE ON employee BEGIN
+        {_BUMP.format(employee="old.id")}
+    END
+    """
+
+
+@event.listens_for(db.metadata, "after_create")
+def _install_versions(target, connection, **kw):
+    if connection.dialect.name != "sqlite":
+        return
+    for ddl in _triggers():
+        connection.exec_driver_sql(ddl)
+
+
+def employee_version(employee_id: int) -> int:
+    return (
+        db.session.execute(
+            db.select(EmployeeDataVersion.version).where(EmployeeDataVersion.employee_id == employee_id)
+        ).scalar()
+        or 0
+    )
+
+
+def link_by_email(user: User) -> Optional[int]:
+    """Link an unlinked login to the employee with the same email; called at sign-in.
+
+    Explicit links (``flask link-user``) are never replaced. The caller commits.
+    """
+    if user.employee_id is None:
+        user.employee_id = db.session.execute(
+            db.select(Employee.id).where(db.func.lower(Employee.email) == user.email.lower())
+        ).scalar()
+    return user.employee_id
+
+
+_cache = LRUCache(maxsize=256)
+
+
+def portal_payload(user: User, limit: int = 5) -> Optional[Dict[str, Any]]:
+    """Everything the ESS portal shows about the signed-in employee, as plain data.
+
+    Cached per user and keyed on the employee's own change counter (plus the
+    department table for the profile), so other people's edits never evict it.
+    """
+    employee_id = user.employee_id
+    if employee_id is None:
+        return None
+    today = date.today()
+    key = (user.id, employee_id, employee_version(employee_id), data_version("department"), today)
+    payload = _cache.get(key)
+    if payload is None:
+        payload = _build_payload(employee_id, today, limit)
+        _cache.set(key, payload)
+    return payload
+
+
+def _build_payload(employee_id: int, today: date, limit: int) -> Optional[Dict[str, Any]]:
+    employee = db.session.get(Employee, employee_id)
+    if employee is None:
+        return None
+    tasks = (
+        OnboardingTask.query.filter(OnboardingTask.employee_id == employee_id, OnboardingTask.status != "done")
+        .order_by(OnboardingTask.due_date.asc().nullslast())
+        .limit(limit)
+        .all()
+    )
+    time_off = (
+        TimeOffRequest.query.filter(TimeOffRequest.employee_id == employee_id)
+        .order_by(TimeOffRequest.start_date.desc())
+        .limit(limit)
+        .all()
+    )
+    payslips = (
+        PayrollEntry.query.filter(PayrollEntry.employee_id == employee_id)
+        .order_by(PayrollEntry.pay_date.desc())
+        .limit(limit)
+        .all()
+    )
+    recognitions = (
+        Recognition.query.filter(Recognition.employee_id == employee_id)
+        .order_by(Recognition.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+    return {
+        "profile": {
+            "id": employee.id,
+            "name": employee.full_name(),
+            "email": employee.email,
+            "phone": employee.phone,
+            "status": employee.status,
+            "start_date": employee.start_date,
+            "department": employee.department.name if employee.department else None,
+        },
+        "tasks": [
+            {
+                "title": t.title,
+                "status": t.status,
+                "due_date": t.due_date,
+                "overdue": bool(t.due_date and t.due_date < today),
+                "notes": t.notes,
+            }
+            for t in tasks
+        ],
+        "time_off": [
+            {"start_date": r.start_date, "end_date": r.end_date, "category": r.category, "status": r.status}
+            for r in time_off
+        ],
+        "payslips": [
+            {
+                "id": p.id,
+                "period_start": p.period_start,
+                "period_end": p.period_end,
+                "pay_date": p.pay_date,
+                "gross_pay": float(p.gross_pay or 0),
+                "net_pay": p.net_pay,
+                "status": p.status,
+            }
+            for p in payslips
+        ],
+        "recognitions": [
+            {"badge": r.badge, "from_person": r.from_person, "message": r.message, "created_at": r.created_at}
+            for r in recognitions
+        ],
+    }
@@ -0,0 +1,207 @@
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from . import db
+from .models import ChannelMessage
+
+
+class _Channel:
+    def __init__(self, backlog: int):
+        self.condition = threading.Condition()
+        self.entries: deque = deque(maxlen=backlog)
+        self.seq = 0
+
+
+class MessageHub:
+    """In-process fan-out of channel messages to streaming listeners.
+
+    Publishers append to a bounded per-channel ring buffer and wake waiters;
+    listeners track a hub sequence number instead of polling the database.
+    Only the process's ``ChannelWatcher`` publishes, so entries arrive in id
+    order whichever worker process the post went through.
+    """
+
+    def __init__(self, backlog: int = 256):
+        self.backlog = backlog
+        self._lock = threading.Lock()
+        self._channels: Dict[str, _Channel] = {}
+
+    def _channel(self, name: str) -> _Channel:
+        with self._lock:
+            channel = self._channels.get(name)
+            if channel is None:
+                channel = self._channels[name] = _Channel(self.backlog)
+            return channel
+
+    def position(self, name: str) -> int:
+        channel = self._channel(name)
+        with channel.condition:
+            return channel.seq
+
+    def publish(self, name: str, payload: Dict[str, Any]) -> None:
+        channel = self._channel(name)
+        with channel.condition:
+            channel.seq += 1
+            channel.entries.append((channel.seq, payload))
+            channel.condition.notify_all()
+
+    def wait(self, name: str, position: int, timeout: float) -> Tuple[int, Optional[List[Dict[str, Any]]]]:
+        """Block until entries newer than ``position`` exist or ``timeout`` passes.
+
+        Returns ``None`` instead of a list when the ring buffer has already
+        dropped entries the caller has not seen.
+        """
+        channel = self._channel(name)
+        with channel.condition:
+            if channel.seq <= position:
+                channel.condition.wait(timeout)
+            if channel.entries and channel.entries[0][0] > position + 1:
+                return channel.seq, None
+            fresh = [payload for seq, payload in channel.entries if seq > position]
+            return channel.seq, fresh
+
+
+hub = MessageHub()
+
+
+def message_payload(msg) -> Dict[str, Any]:
+    return {
+        "id": msg.id,
+        "channel": msg.channel,
+        "author": msg.author,
+        "message": msg.message,
+        "created_at": msg.created_at.strftime("%Y-%m-%d %H:%M"),
+    }
+
+
+class ChannelWatcher:
+    """Publishes new channel messages to the hub, once per process.
+
+    A single thread reads rows past the last id it has seen, either every
+    ``interval`` seconds or as soon as this process posts, so posts made in
+    other worker processes reach local listeners too. Idle listeners only wait
+    on the hub; none of them holds a connection or queries the table.
+    """
+
+    def __init__(self, app, engine, interval: float, batch: int):
+        self.app = app
+        self.engine = engine
+        self.interval = interval
+        self.batch = batch
+        self._wake = threading.Event()
+        with engine.connect() as conn:
+            # Read before any listener takes its hub position, so nothing
+            # committed after a listener's backlog query is skipped.
+            self.last_id = conn.execute(select(func.coalesce(func.max(ChannelMessage.id), 0))).scalar()
+        self._thread = threading.Thread(target=self._run, name="channel-watcher", daemon=True)
+        self._thread.start()
+
+    def poke(self) -> None:
+        self._wake.set()
+
+    def _run(self) -> None:
+        # Like the kiosk writer, the watcher keeps its own connection rather
+        # than competing with request threads for the pool.
+        table = ChannelMessage.__table__
+        conn = None
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                if conn is None:
+                    conn = self.engine.connect()
+                # One short read transaction per poll; an open one would pin
+                # an old snapshot and keep the WAL from being checkpointed.
+                with conn.begin():
+                    rows = conn.execute(
+                        select(table).where(table.c.id > self.last_id).order_by(table.c.id).limit(self.batch)
+                    ).all()
+            except Exception:
+                self.app.logger.exception("Channel watcher poll failed")
+                if conn is not None:
+                    conn.close()
+                    conn = None
+                continue
+            for row in rows:
+                hub.publish(row.channel, message_payload(row))
+                self.last_id = row.id
+            if len(rows) == self.batch:
+                self._wake.set()
+
+
+_watcher_lock = threading.Lock()
+
+
+def get_watcher() -> ChannelWatcher:
+    watcher = current_app.extensions.get("channel_watcher")
+    if watcher is None:
+        with _watcher_lock:
+            watcher = current_app.extensions.get("channel_watcher")
+            if watcher is None:
+                config = current_app.config
+                watcher = current_app.extensions["channel_watcher"] = ChannelWatcher(
+                    current_app._get_current_object(), db.engine, config["SSE_POLL_SECONDS"], config["SSE_BACKLOG_LIMIT"]
+                )
+    return watcher
+
+
+def poke_watcher() -> None:
+    """Have this process's watcher pick up a post now rather than on its next poll."""
+    watcher = current_app.extensions.get("channel_watcher")
+    if watcher is not None:
+        watcher.poke()
+
+
+def format_event(payload: Dict[str, Any], event_id: Optional[int] = None, event: str = "message") -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(payload)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def stream_channel(
+    name: str,
+    backlog: List[Dict[str, Any]],
+    position: int,
+    heartbeat: float,
+    max_seconds: float,
+) -> Iterator[str]:
+    """Yield SSE frames: the database backlog first, then live hub entries.
+
+    ``position`` must be taken from the hub *before* the backlog query so
+    nothing published in between is lost; duplicates are dropped by id.
+    After ``max_seconds`` the stream ends and the browser reconnects with
+    Last-Event-ID, which also spreads long-lived streams across workers.
+    """
+    yield "retry: 2000\n\n"
+    last_id = 0
+    for payload in backlog:
+        last_id = payload["id"]
+        yield format_event(payload, payload["id"])
+
+    deadline = time.monotonic() + max_seconds
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        position, fresh = hub.wait(name, position, min(heartbeat, remaining))
+        if fresh is None:
+            # Fell behind the ring buffer; closing makes the browser reconnect
+            # with Last-Event-ID and pick up the gap from the database.
+            return
+        if not fresh:
+            yield ": keep-alive\n\n"
+            continue
+        for payload in fresh:
+            if payload["id"] <= last_id:
+                continue
+            last_id = payload["id"]
+            yield format_event(payload, payload["id"])
@@ -0,0 +1,109 @@
+import os
+import shutil
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from flask import current_app
+from sqlalchemy import text
+
+from . import db
+from .cache import LRUCache
+
+
+def _cache() -> LRUCache:
+    cache = current_app.extensions.get("health_cache")
+    if cache is None:
+        cache = current_app.extensions["health_cache"] = LRUCache(
+            maxsize=8, ttl=current_app.config["HEALTH_CACHE_SECONDS"]
+        )
+    return cache
+
+
+def _cached(name: str, build):
+    # Probes hit every worker every second; each check runs at most once per
+    # HEALTH_CACHE_SECONDS per process and the rest read the last result.
+    cache = _cache()
+    value = cache.get(name)
+    if value is None:
+        value = build()
+        cache.set(name, value)
+    return value
+
+
+def _database_file() -> Optional[str]:
+    url = db.engine.url
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        return None
+    return os.path.abspath(url.database)
+
+
+def check_database() -> Dict[str, Any]:
+    def build():
+        started = time.perf_counter()
+        try:
+            db.session.execute(text("SELECT 1")).scalar()
+        except Exception as err:
+            db.session.rollback()
+            return {"status": "error", "error": str(err)[:200]}
+        return {"status": "ok", "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+    return _cached("database", build)
+
+
+def check_storage() -> Dict[str, Any]:
+    def build():
+        path = _database_file()
+        if path is None:
+            return {"status": "ok"}
+        wal = path + "-wal"
+        usage = shutil.disk_usage(os.path.dirname(path))
+        free_mb = usage.free // (1024 * 1024)
+        return {
+            "status": "ok" if free_mb >= current_app.config["HEALTH_MIN_FREE_MB"] else "error",
+            "database_bytes": os.path.getsize(path) if os.path.exists(path) else 0,
+            "wal_bytes": os.path.getsize(wal) if os.path.exists(wal) else 0,
+            "disk_free_mb": free_mb,
+        }
+
+    return _cached("storage", build)
+
+
+def check_jobs() -> Dict[str, Any]:
+    from .jobs import queue_depth
+
+    def build():
+        try:
+            return {"status": "ok", "queued": queue_depth()}
+        except Exception as err:
+            db.session.rollback()
+            return {"status": "error", "error": str(err)[:200]}
+
+    return _cached("jobs", build)
+
+
+def pool_stats() -> Dict[str, Any]:
+    # Read straight off the pool object, so always current and free.
+    pool = db.engine.pool
+    stats = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    return stats
+
+
+def readiness() -> Dict[str, Any]:
+    checks = {
+        "database": check_database(),
+        "storage": check_storage(),
+        "jobs": check_jobs(),
+    }
+    # The job queue is reported, not gated on: a backlog is no reason to stop serving.
+    ready = checks["database"]["status"] == "ok" and checks["storage"]["status"] == "ok"
+    return {
+        "status": "ready" if ready else "unavailable",
+        "checks": checks,
+        "pool": pool_stats(),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+    }
@@ -0,0 +1,318 @@
+import csv
+import json
+import os
+import signal
+import socket
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from flask import current_app
+from sqlalchemy import text
+
+from . import db
+from .models import Job
+from .versioning import bump_tables
+
+# kind -> (handler, max_attempts, fields). Handlers receive the decoded payload
+# and a progress(percent, message) callback and return a JSON-serialisable
+# result; ``fields`` maps the payload keys a form may set to their converters.
+_HANDLERS: Dict[str, tuple] = {}
+
+_CLAIM_SQL = text(
+    """
+    UPDATE job
+    SET status = 'running', worker = :worker, attempts = attempts + 1,
+        started_at = :now, locked_until = :lease
+    WHERE id = (
+        SELECT id FROM job
+        WHERE (status = 'queued' AND run_after <= :now)
+           OR (status = 'running' AND locked_until < :now AND attempts < max_attempts)
+        ORDER BY run_after, id
+        LIMIT 1
+    )
+    RETURNING id
+    """
+)
+
+# A lease that lapsed on the last attempt means the job took its worker down
+# (OOM, segfault, SIGKILL) every time; retrying it again would never end.
+_EXPIRE_SQL = text(
+    """
+    UPDATE job
+    SET status = 'failed', locked_until = NULL, finished_at = :now,
+        error = coalesce(error, 'Worker lost: lease expired on the final attempt')
+    WHERE status = 'running' AND locked_until < :now AND attempts >= max_attempts
+    """
+)
+
+
+def job(kind: str, max_attempts: Optional[int] = None, fields: Optional[Dict[str, Callable[[str], Any]]] = None):
+    def decorator(func: Callable[[Dict[str, Any], Callable[[int, str], None]], Any]):
+        _HANDLERS[kind] = (func, max_attempts, fields or {})
+        return func
+
+    return decorator
+
+
+def registered_kinds():
+    return sorted(_HANDLERS)
+
+
+def form_payload(kind: str, form) -> Dict[str, Any]:
+    """Build a typed payload for ``kind`` from form fields, which all arrive as strings."""
+    if kind not in _HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    fields = _HANDLERS[kind][2]
+    payload = {}
+    for key, value in form.items():
+        if key == "kind" or not value:
+            continue
+        if key not in fields:
+            raise ValueError(f"Unknown field for {kind}: {key}")
+        try:
+            payload[key] = fields[key](value)
+        except ValueError:
+            raise ValueError(f"Invalid {key}: {value!r}") from None
+    return payload
+
+
+def enqueue(kind: str, payload: Optional[Dict[str, Any]] = None, run_after: Optional[datetime] = None) -> Job:
+    if kind not in _HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    _, max_attempts, _ = _HANDLERS[kind]
+    record = Job(
+        kind=kind,
+        payload=json.dumps(payload or {}),
+        max_attempts=max_attempts or current_app.config["JOB_MAX_ATTEMPTS"],
+        run_after=run_after or datetime.utcnow(),
+    )
+    db.session.add(record)
+    db.session.commit()
+    return record
+
+
+def queue_depth() -> int:
+    return db.session.execute(
+        db.select(db.func.count(Job.id)).where(Job.status == "queued")
+    ).scalar_one()
+
+
+def backoff_delay(attempt: int) -> float:
+    base = current_app.config["JOB_BACKOFF_SECONDS"]
+    return min(base * 2 ** max(attempt - 1, 0), current_app.config["JOB_BACKOFF_MAX_SECONDS"])
+
+
+def claim_next(worker: str) -> Optional[int]:
+    # A single UPDATE ... RETURNING is atomic under SQLite's write lock, so
+    # concurrent workers never claim the same row. Expired leases are retaken.
+    now = datetime.utcnow()
+    lease = now + timedelta(seconds=current_app.config["JOB_LEASE_SECONDS"])
+    expired = db.session.execute(_EXPIRE_SQL, {"now": now}).rowcount
+    job_id = db.session.execute(_CLAIM_SQL, {"worker": worker, "now": now, "lease": lease}).scalar()
+    if job_id is not None or expired:
+        bump_tables(db.session.connection(), [Job.__tablename__])
+    db.session.commit()
+    return job_id
+
+
+def _progress_reporter(job_id: int) -> Callable[[int, str], None]:
+    lease_seconds = current_app.config["JOB_LEASE_SECONDS"]
+
+    def report(percent: int, message: str = "") -> None:
+        # Own short transaction so progress is visible without committing the
+        # handler's unfinished work; also extends the lease.
+        with db.engine.begin() as conn:
+            conn.execute(
+                db.update(Job)
+                .where(Job.id == job_id)
+                .values(
+                    progress=max(0, min(int(percent), 100)),
+                    progress_message=(message or "")[:200],
+                    locked_until=datetime.utcnow() + timedelta(seconds=lease_seconds),
+                )
+            )
+
+    return report
+
+
+def _keep_lease(job_id: int) -> threading.Event:
+    """Renew the job's lease in the background until the returned event is set.
+
+    Handlers that never report progress would otherwise lose their lease
+    mid-run and be claimed (or expired) by another worker.
+    """
+    app = current_app._get_current_object()
+    engine = db.engine
+    lease_seconds = app.config["JOB_LEASE_SECONDS"]
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(lease_seconds / 3):
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        db.update(Job)
+                        .where(Job.id == job_id, Job.status == "running")
+                        .values(locked_until=datetime.utcnow() + timedelta(seconds=lease_seconds))
+                    )
+            except Exception as err:  # e.g. the handler holds the write lock; try again next beat
+                app.logger.warning("Lease renewal for job %s failed: %s", job_id, err)
+
+    threading.Thread(target=beat, name=f"job-lease-{job_id}", daemon=True).start()
+    return stop
+
+
+def run_job(job_id: int) -> None:
+    record = db.session.get(Job, job_id)
+    handler, _, _ = _HANDLERS.get(record.kind, (None, None, None))
+    payload = json.loads(record.payload or "{}")
+    heartbeat = _keep_lease(job_id)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for {record.kind}")
+        try:
+            result = handler(payload, _progress_reporter(job_id))
+        finally:
+            heartbeat.set()
+    except Exception as err:
+        db.session.rollback()
+        record = db.session.get(Job, job_id)
+        record.error = f"{type(err).__name__}: {err}"
+        record.locked_until = None
+        if record.attempts < record.max_attempts:
+            record.status = "queued"
+            record.run_after = datetime.utcnow() + timedelta(seconds=backoff_delay(record.attempts))
+        else:
+            record.status = "failed"
+            record.finished_at = datetime.utcnow()
+        db.session.commit()
+        current_app.logger.warning("Job %s (%s) failed: %s", job_id, record.kind, record.error)
+        return
+
+    record = db.session.get(Job, job_id)
+    record.status = "succeeded"
+    record.result = json.dumps(result)
+    record.progress = 100
+    record.error = None
+    record.locked_until = None
+    record.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def _work_loop(app, name: str, stop: threading.Event, poll_interval: float, drain: bool) -> None:
+    while not stop.is_set():
+        with app.app_context():
+            job_id = claim_next(name)
+            if job_id is not None:
+                run_job(job_id)
+                continue
+        if drain:
+            return
+        stop.wait(poll_interval)
+
+
+def run_worker(app, concurrency: int, poll_interval: float, drain: bool = False) -> None:
+    """Run ``concurrency`` worker threads against the job table until interrupted."""
+    stop = threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    threads = [
+        threading.Thread(
+            target=_work_loop,
+            args=(app, f"{prefix}:{index}", stop, poll_interval, drain),
+            name=f"job-worker-{index}",
+            daemon=True,
+        )
+        for index in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=0.5)
+
+
+def _process_main(threads: int, poll_interval: float, drain: bool) -> None:
+    from . import create_app
+
+    run_worker(create_app(), threads, poll_interval, drain)
+
+
+def run_worker_processes(processes: int, threads: int, poll_interval: float, drain: bool = False) -> None:
+    """Spawn ``processes`` interpreters, each running its own threaded worker.
+
+    Children build their own app (and engine) from the default factory, so
+    use this for CPU-heavy jobs against the configured database.
+    """
+    import multiprocessing
+
+    ctx = multiprocessing.get_context("spawn")
+    children = [
+        ctx.Process(target=_process_main, args=(threads, poll_interval, drain), name=f"job-worker-proc-{index}")
+        for index in range(processes)
+    ]
+    for child in children:
+        child.start()
+    try:
+        for child in children:
+            child.join()
+    except KeyboardInterrupt:
+        for child in children:
+            child.terminate()
+        for child in children:
+            child.join()
+
+
+# Built-in jobs ------------------------------------------------------------
+
+
+def export_path(filename: str) -> Path:
+    directory = Path(current_app.config["EXPORT_DIR"])
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / filename
+
+
+@job("export", fields={"resource": str})
+def export_resource(payload, progress):
+    from .api import RESOURCES, to_jsonable, visible_columns
+
+    resource = payload.get("resource")
+    model = RESOURCES.get(resource)
+    if model is None:
+        raise ValueError(f"Unknown resource: {resource}")
+
+    columns = list(visible_columns(model).values())
+    total = db.session.execute(db.select(db.func.count()).select_from(model.__table__)).scalar_one()
+    filename = f"{resource}-{datetime.utcnow():%Y%m%d%H%M%S}.csv"
+    written = 0
+    with export_path(filename).open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow([col.name for col in columns])
+        rows = db.session.execute(db.select(*columns).order_by(model.__table__.c.id)).yield_per(1000)
+        for row in rows:
+            writer.writerow([to_jsonable(value) for value in row])
+            written += 1
+            if written % 1000 == 0:
+                progress(int(written * 100 / max(total, 1)), f"{written} of {total} rows")
+    return {"file": filename, "rows": written}
+
+
+@job("archive-messages", fields={"days": int, "batch_size": int})
+def archive_messages_job(payload, progress):
+    from .archive import archive_channel_messages
+
+    moved = archive_channel_messages(days=payload.get("days"), batch_size=payload.get("batch_size"))
+    return {"archived": moved}
+
+
+@job("search-reindex")
+def search_reindex_job(payload, progress):
+    from .search import rebuild_index
+
+    rebuild_index()
+    return {"rebuilt": True}
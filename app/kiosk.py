@@ -0,0 +1,219 @@
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from . import db
+from .models import AttendanceLog, Employee
+from .versioning import bump_tables
+
+ACTIONS = ("in", "out")
+
+
+class _Pending:
+    __slots__ = ("item", "done", "result", "error")
+
+    def __init__(self, item: Dict[str, Any]):
+        self.item = item
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[Exception] = None
+
+
+class GroupCommitWriter:
+    """Collects kiosk check-ins and writes them in shared transactions.
+
+    Request threads enqueue a check-in and block until the batch containing it
+    has committed, so a 200 still means the row is on disk; the database pays
+    one commit (and one WAL sync) per batch instead of one per badge swipe.
+    """
+
+    def __init__(self, engine, interval: float, max_batch: int):
+        self.engine = engine
+        self.interval = interval
+        self.max_batch = max_batch
+        self.batches = 0
+        self.writes = 0
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="kiosk-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        pending = _Pending(item)
+        self._queue.put(pending)
+        if not pending.done.wait(timeout):
+            raise TimeoutError("Check-in was not committed in time.")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect(self) -> List[_Pending]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        # The writer keeps its own connection so it never waits on a pool that
+        # blocked request threads may have drained.
+        conn = None
+        while True:
+            batch = self._collect()
+            try:
+                if conn is None:
+                    conn = self.engine.connect()
+                with conn.begin():
+                    # Written first: the driver only opens the batch transaction on
+                    # a write, and the savepoints below must nest inside it.
+                    bump_tables(conn, [AttendanceLog.__tablename__])
+                    ids = {pending.item["employee_id"] for pending in batch}
+                    known = set(conn.execute(select(Employee.id).where(Employee.id.in_(ids))).scalars())
+                    for pending in batch:
+                        if pending.item["employee_id"] not in known:
+                            pending.error = LookupError(f"Unknown employee {pending.item['employee_id']}")
+                            continue
+                        # One savepoint per check-in, so a bad one fails alone.
+                        try:
+                            with conn.begin_nested():
+                                pending.result = _apply(conn, pending.item)
+                        except Exception as err:
+                            pending.error = err
+                self.batches += 1
+                self.writes += len(batch)
+            except Exception as err:  # the whole transaction rolled back
+                for pending in batch:
+                    pending.result, pending.error = None, err
+                if conn is not None:
+                    conn.close()
+                    conn = None
+            finally:
+                for pending in batch:
+                    pending.done.set()
+
+
+def _apply(conn, item: Dict[str, Any]) -> Dict[str, Any]:
+    # Upsert on the unique (employee_id, work_date) index, so workers in other
+    # processes (each with its own writer) cannot create a second day row.
+    table = AttendanceLog.__table__
+    at: datetime = item["at"]
+    work_date, moment = at.date(), at.time().replace(microsecond=0)
+    checking_in = item["action"] == "in"
+    stmt = sqlite_insert(table).values(
+        employee_id=item["employee_id"],
+        work_date=work_date,
+        check_in=moment if checking_in else None,
+        check_out=None if checking_in else moment,
+        status="present",
+        created_at=datetime.utcnow(),
+    )
+    if checking_in:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.employee_id, table.c.work_date],
+            set_={
+                "check_in": db.func.coalesce(table.c.check_in, stmt.excluded.check_in),
+                "status": db.case((table.c.status.in_(("absent", "leave")), "present"), else_=table.c.status),
+            },
+        )
+    else:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.employee_id, table.c.work_date],
+            set_={"check_out": stmt.excluded.check_out},
+            where=db.or_(table.c.check_in.is_(None), table.c.check_in <= stmt.excluded.check_out),
+        )
+    row = conn.execute(
+        stmt.returning(table.c.id, table.c.work_date, table.c.check_in, table.c.check_out, table.c.status)
+    ).first()
+    if row is None:
+        # The conflict's WHERE rejected it: the day's check-in is later.
+        raise ValueError(f"Check-out at {moment.isoformat()} is earlier than the day's check-in.")
+    return {
+        "id": row.id,
+        "employee_id": item["employee_id"],
+        "work_date": row.work_date.isoformat(),
+        "check_in": row.check_in.isoformat() if row.check_in else None,
+        "check_out": row.check_out.isoformat() if row.check_out else None,
+        "status": row.status,
+    }
+
+
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> GroupCommitWriter:
+    writer = current_app.extensions.get("kiosk_writer")
+    if writer is None:
+        with _writer_lock:
+            writer = current_app.extensions.get("kiosk_writer")
+            if writer is None:
+                config = current_app.config
+                writer = current_app.extensions["kiosk_writer"] = GroupCommitWriter(
+                    db.engine, config["KIOSK_FLUSH_INTERVAL"], config["KIOSK_MAX_BATCH"]
+                )
+    return writer
+
+
+def record_check(employee_id: int, action: str, at: Optional[datetime] = None) -> Dict[str, Any]:
+    if action not in ACTIONS:
+        raise ValueError(f"action must be one of {', '.join(ACTIONS)}")
+    item = {"employee_id": employee_id, "action": action, "at": at or datetime.now()}
+    # Hand the request's pooled connection back before blocking on the batch.
+    db.session.close()
+    return get_writer().submit(item, current_app.config["KIOSK_COMMIT_TIMEOUT"])
+
+
+def benchmark(app, total: int, threads: int) -> Dict[str, float]:
+    """Fire ``total`` check-ins from ``threads`` clients at the kiosk endpoint."""
+    from .models import User
+
+    with app.app_context():
+        user_id = db.session.execute(select(User.id)).scalar()
+        employee_ids = list(db.session.execute(select(Employee.id)).scalars())
+    if not employee_ids:
+        raise RuntimeError("Seed some employees first.")
+
+    failures = []
+
+    def client_loop(index: int) -> None:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session["user_id"] = user_id
+        for n in range(index, total, threads):
+            action = "in" if (n // len(employee_ids)) % 2 == 0 else "out"
+            response = client.post(
+                "/api/v1/attendance/check",
+                json={"employee_id": employee_ids[n % len(employee_ids)], "action": action},
+            )
+            if response.status_code != 200:
+                failures.append(response.status_code)
+
+    with app.app_context():
+        writer = get_writer()
+    batches_before, writes_before = writer.batches, writer.writes
+    started = time.perf_counter()
+    workers = [threading.Thread(target=client_loop, args=(index,)) for index in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    batches = writer.batches - batches_before
+    return {
+        "requests": total,
+        "failures": len(failures),
+        "seconds": elapsed,
+        "per_second": total / elapsed if elapsed else 0.0,
+        "batches": batches,
+        "avg_batch": (writer.writes - writes_before) / batches if batches else 0.0,
+    }
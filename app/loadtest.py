@@ -0,0 +1,187 @@
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from http.cookiejar import CookieJar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Weighted user journeys run against a live server over HTTP. Every virtual
+# user keeps its own cookie session, picks a scenario by weight, runs it and
+# records one sample per HTTP request.
+DEFAULT_MIX = {"dashboard": 35, "payroll": 25, "checkin": 20, "chat": 10, "login": 10}
+CHECKIN_BURST = 5
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Time each response on its own; a 302 after login is a success, not a hop.
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class VirtualUser:
+    def __init__(self, base_url: str, email: str, password: str, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.email = email
+        self.password = password
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()), _NoRedirect)
+        self.samples: List[Tuple[str, int, float]] = []
+
+    def request(self, method: str, path: str, form=None, payload=None) -> int:
+        """Send one request and record (label, status, seconds); status 0 means no response."""
+        data, headers = None, {}
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        elif payload is not None:
+            data = json.dumps(payload).encode()
+            headers["Content-Type"] = "application/json"
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        started = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as err:
+            err.read()
+            status = err.code
+        except OSError:  # refused, reset or timed out
+            status = 0
+        self.samples.append((f"{method} {path.split('?')[0]}", status, time.perf_counter() - started))
+        return status
+
+    def login(self) -> int:
+        return self.request("POST", "/auth/login", form={"email": self.email, "password": self.password})
+
+
+def _scenario_login(user: VirtualUser, employee_ids) -> None:
+    user.login()
+    user.request("GET", "/")
+
+
+def _scenario_dashboard(user: VirtualUser, employee_ids) -> None:
+    user.request("GET", "/")
+
+
+def _scenario_payroll(user: VirtualUser, employee_ids) -> None:
+    user.request("GET", "/payroll")
+
+
+def _scenario_checkin(user: VirtualUser, employee_ids) -> None:
+    for _ in range(CHECKIN_BURST):
+        payload = {"employee_id": random.choice(employee_ids), "action": random.choice(("in", "out"))}
+        user.request("POST", "/api/v1/attendance/check", payload=payload)
+
+
+def _scenario_chat(user: VirtualUser, employee_ids) -> None:
+    message = random.choice(("How many PTO days do I have?", "Summarise this week's announcements.", "Who is on leave?"))
+    user.request("POST", "/api/chat", payload={"message": message})
+
+
+SCENARIOS: Dict[str, Callable[[VirtualUser, Sequence[int]], None]] = {
+    "login": _scenario_login,
+    "dashboard": _scenario_dashboard,
+    "payroll": _scenario_payroll,
+    "checkin": _scenario_checkin,
+    "chat": _scenario_chat,
+}
+
+
+def parse_mix(raw: Optional[str]) -> Dict[str, int]:
+    """``"dashboard=40,chat=10"`` -> weights; unknown scenarios are rejected."""
+    if not raw:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+
+def run_stage(
+    base_url: str,
+    users: int,
+    duration: float,
+    mix: Dict[str, int],
+    email: str,
+    password: str,
+    think: float = 0.0,
+    timeout: float = 30.0,
+) -> Dict[str, object]:
+    """Run ``users`` concurrent virtual users for ``duration`` seconds."""
+    samples: List[Tuple[str, int, float]] = []
+    lock = threading.Lock()
+    names, weights = list(mix), list(mix.values())
+
+    setup = VirtualUser(base_url, email, password, timeout)
+    if setup.login() != 302:
+        raise RuntimeError(f"Could not sign in to {base_url} as {email}.")
+    employee_ids = _employee_ids(setup)
+
+    deadline = time.monotonic() + duration
+
+    def loop() -> None:
+        user = VirtualUser(base_url, email, password, timeout)
+        user.login()
+        user.samples.clear()  # the warm-up login is not part of the mix
+        while time.monotonic() < deadline:
+            SCENARIOS[random.choices(names, weights)[0]](user, employee_ids)
+            if think:
+                time.sleep(random.uniform(0, 2 * think))
+        with lock:
+            samples.extend(user.samples)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=loop, daemon=True) for _ in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return summarise(samples, users, elapsed)
+
+
+def _employee_ids(user: VirtualUser) -> List[int]:
+    req = urllib.request.Request(user.base_url + "/api/v1/employees?fields=id&limit=1000")
+    with user.opener.open(req, timeout=user.timeout) as response:
+        ids = [row["id"] for row in json.loads(response.read())["data"]]
+    if not ids:
+        raise RuntimeError("The server has no employees; seed it first.")
+    return ids
+
+
+def summarise(samples: List[Tuple[str, int, float]], users: int, elapsed: float) -> Dict[str, object]:
+    def stats(rows):
+        latencies = sorted(latency for _, _, latency in rows)
+        errors = sum(1 for _, status, _ in rows if not status or status >= 400)
+        return {
+            "requests": len(rows),
+            "errors": errors,
+            "error_rate": errors / len(rows) if rows else 0.0,
+            "p50_ms": _percentile(latencies, 50) * 1000,
+            "p90_ms": _percentile(latencies, 90) * 1000,
+            "p99_ms": _percentile(latencies, 99) * 1000,
+            "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        }
+
+    by_label = defaultdict(list)
+    for sample in samples:
+        by_label[sample[0]].append(sample)
+    total = stats(samples)
+    total.update({"users": users, "seconds": elapsed, "rps": len(samples) / elapsed if elapsed else 0.0})
+    total["requests_by_label"] = {label: stats(rows) for label, rows in sorted(by_label.items())}
+    return total
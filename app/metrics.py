@@ -0,0 +1,187 @@
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional
+
+from . import db
+from .jobs import enqueue, job
+from .models import (
+    AttendanceLog,
+    Employee,
+    Job,
+    MetricSnapshot,
+    OnboardingTask,
+    PayrollEntry,
+    PerformanceReview,
+    Recognition,
+)
+
+PRESENT_STATUSES = ("present", "remote")
+STOCK_METRICS = ("headcount", "active", "on_leave", "payroll_scheduled", "open_onboarding", "open_reviews")
+FLOW_METRICS = ("attendance_logged", "attendance_present", "payroll_paid", "recognitions")
+
+
+def _grouped(query) -> Dict[Optional[int], tuple]:
+    return {row[0]: row[1:] for row in query.all()}
+
+
+def snapshot_metrics(day: Optional[date] = None) -> int:
+    """Record one MetricSnapshot per department for ``day`` (idempotent)."""
+    day = day or date.today()
+    start = datetime.combine(day, time.min)
+    end = start + timedelta(days=1)
+    dept = Employee.department_id
+    session = db.session
+
+    people = _grouped(
+        session.query(
+            dept,
+            db.func.count(Employee.id),
+            db.func.sum(db.case((Employee.status == "active", 1), else_=0)),
+            db.func.sum(db.case((Employee.status == "on-leave", 1), else_=0)),
+        ).group_by(dept)
+    )
+    attendance = _grouped(
+        session.query(
+            dept,
+            db.func.count(AttendanceLog.id),
+            db.func.sum(db.case((AttendanceLog.status.in_(PRESENT_STATUSES), 1), else_=0)),
+        )
+        .join(Employee, Employee.id == AttendanceLog.employee_id)
+        .filter(AttendanceLog.work_date == day)
+        .group_by(dept)
+    )
+    payroll = _grouped(
+        session.query(
+            dept,
+            db.func.sum(db.case((PayrollEntry.status == "scheduled", PayrollEntry.gross_pay), else_=0)),
+            db.func.sum(
+                db.case(
+                    (db.and_(PayrollEntry.status == "paid", PayrollEntry.pay_date == day), PayrollEntry.gross_pay),
+                    else_=0,
+                )
+            ),
+        )
+        .join(Employee, Employee.id == PayrollEntry.employee_id)
+        .group_by(dept)
+    )
+    onboarding = _grouped(
+        session.query(dept, db.func.count(OnboardingTask.id))
+        .join(Employee, Employee.id == OnboardingTask.employee_id)
+        .filter(OnboardingTask.status != "done")
+        .group_by(dept)
+    )
+    reviews = _grouped(
+        session.query(dept, db.func.count(PerformanceReview.id))
+        .join(Employee, Employee.id == PerformanceReview.employee_id)
+        .filter(PerformanceReview.status != "submitted")
+        .group_by(dept)
+    )
+    recognitions = _grouped(
+        session.query(dept, db.func.count(Recognition.id))
+        .join(Employee, Employee.id == Recognition.employee_id)
+        .filter(Recognition.created_at >= start, Recognition.created_at < end)
+        .group_by(dept)
+    )
+
+    departments = set(people) | set(attendance) | set(payroll) | set(onboarding) | set(reviews) | set(recognitions)
+    rows = []
+    for department_id in departments:
+        headcount, active, on_leave = people.get(department_id, (0, 0, 0))
+        logged, present = attendance.get(department_id, (0, 0))
+        scheduled, paid = payroll.get(department_id, (0, 0))
+        rows.append(
+            {
+                "day": day,
+                "department_id": department_id,
+                "headcount": headcount or 0,
+                "active": active or 0,
+                "on_leave": on_leave or 0,
+                "attendance_logged": logged or 0,
+                "attendance_present": present or 0,
+                "payroll_scheduled": scheduled or 0,
+                "payroll_paid": paid or 0,
+                "open_onboarding": onboarding.get(department_id, (0,))[0],
+                "open_reviews": reviews.get(department_id, (0,))[0],
+                "recognitions": recognitions.get(department_id, (0,))[0],
+            }
+        )
+
+    session.execute(db.delete(MetricSnapshot).where(MetricSnapshot.day == day))
+    if rows:
+        session.execute(db.insert(MetricSnapshot), rows)
+    session.commit()
+    return len(rows)
+
+
+def monthly_trends(months: int = 12, department_id: Optional[int] = None) -> "OrderedDict[str, Dict[str, float]]":
+    """Roll daily snapshots up to months: last value for stocks, sums for flows.
+
+    Reads one row per department per day in the window, never the source tables.
+    """
+    today = date.today()
+    first = date(today.year, today.month, 1)
+    for _ in range(months - 1):
+        first = (first - timedelta(days=1)).replace(day=1)
+
+    columns = [MetricSnapshot.day, *(getattr(MetricSnapshot, name) for name in STOCK_METRICS + FLOW_METRICS)]
+    query = db.select(*columns).where(MetricSnapshot.day >= first).order_by(MetricSnapshot.day)
+    if department_id is not None:
+        query = query.where(MetricSnapshot.department_id == department_id)
+
+    daily: Dict[date, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for row in db.session.execute(query):
+        totals = daily[row.day]
+        for name in STOCK_METRICS + FLOW_METRICS:
+            totals[name] += float(getattr(row, name) or 0)
+
+    trends: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+    cursor = first
+    while cursor <= today:
+        trends[cursor.strftime("%Y-%m")] = {name: 0.0 for name in STOCK_METRICS + FLOW_METRICS}
+        cursor = (cursor + timedelta(days=32)).replace(day=1)
+
+    for day in sorted(daily):
+        month = trends[day.strftime("%Y-%m")]
+        for name in STOCK_METRICS:
+            month[name] = daily[day][name]  # later days overwrite earlier ones
+        for name in FLOW_METRICS:
+            month[name] += daily[day][name]
+
+    for month in trends.values():
+        logged = month["attendance_logged"]
+        month["attendance_rate"] = round(100 * month["attendance_present"] / logged, 1) if logged else 0.0
+    return trends
+
+
+def sparkline(values: List[float], width: int = 160, height: int = 36) -> str:
+    """SVG polyline points for ``values`` scaled into a width x height box."""
+    if not values:
+        return ""
+    low, high = min(values), max(values)
+    span = (high - low) or 1
+    step = width / max(len(values) - 1, 1)
+    return " ".join(
+        f"{index * step:.1f},{height - (value - low) / span * (height - 4) - 2:.1f}" for index, value in enumerate(values)
+    )
+
+
+@job("metrics-snapshot", fields={"day": lambda value: date.fromisoformat(value).isoformat()})
+def metrics_snapshot_job(payload, progress):
+    if payload.get("day"):
+        day = date.fromisoformat(payload["day"])
+    elif payload.get("repeat"):
+        # Scheduled runs start just after midnight, so record the day that just ended.
+        day = date.today() - timedelta(days=1)
+    else:
+        day = date.today()
+    written = snapshot_metrics(day)
+    if payload.get("repeat"):
+        # Keep a single daily chain alive: schedule tomorrow's run unless one is queued.
+        pending = db.session.execute(
+            db.select(Job.id).where(Job.kind == "metrics-snapshot", Job.status == "queued")
+        ).first()
+        if pending is None:
+            # 00:05 local time, stored as naive UTC like every other run_after.
+            tomorrow = datetime.combine(date.today() + timedelta(days=1), time(0, 5)).astimezone(timezone.utc)
+            enqueue("metrics-snapshot", {"repeat": True}, run_after=tomorrow.replace(tzinfo=None))
+    return {"day": day.isoformat(), "rows": written}
@@ -1,3 +1,4 @@
+import json
 from datetime import datetime, date
 from werkzeug.security import check_password_hash, generate_password_hash
 
@@ -9,6 +10,9 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     full_name = db.Column(db.String(120), nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
+    employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=True)
+
+    employee = db.relationship("Employee")
 
     def set_password(self, password: str) -> None:
         self.password_hash = generate_password_hash(password)
@@ -17,6 +21,16 @@ class User(db.Model):
         return check_password_hash(self.password_hash, password)
 
 
+class ApiToken(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    label = db.Column(db.String(120), nullable=True)
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)  # sha256 hex; the raw token is never stored
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    user = db.relationship("User", backref="api_tokens")
+
+
 class Department(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), unique=True, nullable=False)
@@ -51,6 +65,8 @@ class Employee(db.Model):
 
 
 class TimeOffRequest(db.Model):
+    __table_args__ = (db.Index("ix_time_off_request_employee_id_start_date", "employee_id", "start_date"),)
+
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=False)
     start_date = db.Column(db.Date, nullable=False)
@@ -64,6 +80,8 @@ class TimeOffRequest(db.Model):
 
 
 class PayrollEntry(db.Model):
+    __table_args__ = (db.Index("ix_payroll_entry_employee_id_pay_date", "employee_id", "pay_date"),)
+
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=False)
     period_start = db.Column(db.Date, nullable=False)
@@ -92,6 +110,11 @@ class Project(db.Model):
 
 
 class ProjectAssignment(db.Model):
+    __table_args__ = (
+        db.Index("ix_project_assignment_project_id", "project_id"),
+        db.Index("ix_project_assignment_employee_id", "employee_id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey("project.id"), nullable=False)
     employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=False)
@@ -103,6 +126,9 @@ class ProjectAssignment(db.Model):
 
 
 class AttendanceLog(db.Model):
+    # One log per employee per day; kiosk check-ins upsert on it.
+    __table_args__ = (db.Index("ux_attendance_log_employee_work_date", "employee_id", "work_date", unique=True),)
+
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=False)
     work_date = db.Column(db.Date, nullable=False)
@@ -122,6 +148,20 @@ class AttendanceLog(db.Model):
         return round(delta.total_seconds() / 3600, 2)
 
 
+# Derived from AttendanceLog: one row per employee per month, where bit
+# (day - 1) of each status column is set when that day has a log with that
+# status. Kept in step by triggers on attendance_log (see presence.py).
+class AttendanceBitmap(db.Model):
+    __table_args__ = (db.Index("ix_attendance_bitmap_month", "month"),)
+
+    employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)  # first day of the month
+    present = db.Column(db.Integer, nullable=False, default=0)
+    remote = db.Column(db.Integer, nullable=False, default=0)
+    absent = db.Column(db.Integer, nullable=False, default=0)
+    leave = db.Column(db.Integer, nullable=False, default=0)
+
+
 class Announcement(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -131,6 +171,12 @@ class Announcement(db.Model):
 
 
 class ChannelMessage(db.Model):
+    # AUTOINCREMENT keeps ids of archived messages from being reused by new posts.
+    __table_args__ = (
+        db.Index("ix_channel_message_channel_created_at", "channel", "created_at"),
+        {"sqlite_autoincrement": True},
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     channel = db.Column(db.String(80), nullable=False, default="general")
     message = db.Column(db.Text, nullable=False)
@@ -139,6 +185,8 @@ class ChannelMessage(db.Model):
 
 
 class PerformanceReview(db.Model):
+    __table_args__ = (db.Index("ix_performance_review_status_period_end", "status", "period_end"),)
+
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=False)
     reviewer = db.Column(db.String(120), nullable=True)
@@ -154,6 +202,11 @@ class PerformanceReview(db.Model):
 
 
 class OnboardingTask(db.Model):
+    __table_args__ = (
+        db.Index("ix_onboarding_task_status_due_date", "status", "due_date"),
+        db.Index("ix_onboarding_task_employee_id_due_date", "employee_id", "due_date"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=False)
     title = db.Column(db.String(200), nullable=False)
@@ -165,7 +218,37 @@ class OnboardingTask(db.Model):
     employee = db.relationship("Employee", backref="onboarding_tasks")
 
 
+class OnboardingTemplate(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(150), nullable=False, unique=True)
+    department_id = db.Column(db.Integer, db.ForeignKey("department.id"), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    department = db.relationship("Department")
+    items = db.relationship(
+        "OnboardingTemplateItem",
+        backref="template",
+        cascade="all, delete-orphan",
+        order_by="(OnboardingTemplateItem.offset_days, OnboardingTemplateItem.id)",
+    )
+
+
+class OnboardingTemplateItem(db.Model):
+    __table_args__ = (db.Index("ix_onboarding_template_item_template_id", "template_id"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    template_id = db.Column(db.Integer, db.ForeignKey("onboarding_template.id"), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    offset_days = db.Column(db.Integer, nullable=False, default=0)  # due date relative to the start date
+    notes = db.Column(db.Text, nullable=True)
+
+
 class BenefitEnrollment(db.Model):
+    __table_args__ = (
+        db.Index("ix_benefit_enrollment_start_date_end_date", "start_date", "end_date"),
+        db.Index("ix_benefit_enrollment_end_date_start_date", "end_date", "start_date"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=False)
     benefit_type = db.Column(db.String(120), nullable=False)
@@ -179,6 +262,11 @@ class BenefitEnrollment(db.Model):
 
 
 class Recognition(db.Model):
+    __table_args__ = (
+        db.Index("ix_recognition_created_at", "created_at"),
+        db.Index("ix_recognition_employee_id_created_at", "employee_id", "created_at"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=False)
     from_person = db.Column(db.String(120), nullable=True)
@@ -187,3 +275,85 @@ class Recognition(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     employee = db.relationship("Employee", backref="recognitions")
+
+
+# Recognition counts per leaderboard period ("week" from Monday, "month", and
+# "all" starting 1970-01-01), per recipient ("employee", key is the id) and per
+# badge. Kept in step by triggers on recognition (see recognitions.py).
+class RecognitionTally(db.Model):
+    period = db.Column(db.String(10), primary_key=True)
+    period_start = db.Column(db.Date, primary_key=True)
+    kind = db.Column(db.String(10), primary_key=True)
+    key = db.Column(db.String(80), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+# One row per day and department. Stock columns (headcount, open items, scheduled
+# payroll) are end-of-day totals; flows (attendance, paid payroll, recognitions)
+# cover that day only.
+class MetricSnapshot(db.Model):
+    __table_args__ = (db.Index("ix_metric_snapshot_day_department", "day", "department_id"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    department_id = db.Column(db.Integer, db.ForeignKey("department.id"), nullable=True)
+    headcount = db.Column(db.Integer, nullable=False, default=0)
+    active = db.Column(db.Integer, nullable=False, default=0)
+    on_leave = db.Column(db.Integer, nullable=False, default=0)
+    attendance_logged = db.Column(db.Integer, nullable=False, default=0)
+    attendance_present = db.Column(db.Integer, nullable=False, default=0)
+    payroll_scheduled = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    payroll_paid = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    open_onboarding = db.Column(db.Integer, nullable=False, default=0)
+    open_reviews = db.Column(db.Integer, nullable=False, default=0)
+    recognitions = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Change counter per employee for the records the ESS portal shows, bumped by
+# triggers (see ess.py) so one person's edits only invalidate their own portal.
+class EmployeeDataVersion(db.Model):
+    employee_id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class TableVersion(db.Model):
+    name = db.Column(db.String(80), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class Job(db.Model):
+    __table_args__ = (db.Index("ix_job_status_run_after", "status", "run_after"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(80), nullable=False)
+    payload = db.Column(db.Text, nullable=True)  # JSON
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued, running, succeeded, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    worker = db.Column(db.String(120), nullable=True)
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    progress_message = db.Column(db.String(200), nullable=True)
+    result = db.Column(db.Text, nullable=True)  # JSON
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "progress": self.progress,
+            "progress_message": self.progress_message,
+            "result": json.loads(self.result) if self.result else None,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -0,0 +1,113 @@
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import db
+from .models import Department, Employee, OnboardingTask, OnboardingTemplate, OnboardingTemplateItem
+
+OPEN_STATUSES = ("open", "in-progress", "blocked")
+# Offsets need a sign or a "d" suffix ("+3", "-2", "3d") so a title that merely
+# starts with a number ("2024 goals review") keeps its text.
+_ITEM_RE = re.compile(r"^\s*(?:([+-]\d+)d?|(\d+)d)\s+(.+?)\s*$")
+
+
+def parse_template_items(text: str) -> List[Tuple[int, str]]:
+    """``"-2 Order laptop"`` per line -> [(-2, "Order laptop")]; no offset means day 0."""
+    items = []
+    for line in (text or "").splitlines():
+        if not line.strip():
+            continue
+        match = _ITEM_RE.match(line)
+        if match:
+            items.append((int(match.group(1) or match.group(2)), match.group(3)[:200]))
+        else:
+            items.append((0, line.strip()[:200]))
+    return items
+
+
+def default_template_id(department_id: Optional[int]) -> Optional[int]:
+    """The department's checklist, else the company-wide one (no department)."""
+    query = db.select(OnboardingTemplate.id).order_by(OnboardingTemplate.id)
+    if department_id:
+        found = db.session.execute(query.where(OnboardingTemplate.department_id == department_id)).scalar()
+        if found:
+            return found
+    return db.session.execute(query.where(OnboardingTemplate.department_id.is_(None))).scalar()
+
+
+def instantiate_template(template_id: int, employee_id: int, start_date: date) -> int:
+    """Copy a checklist template onto an employee as one INSERT ... SELECT.
+
+    Due dates are the start date shifted by each item's offset. The caller
+    commits, so this can share the transaction that creates the employee.
+    """
+    due = db.func.date(start_date.isoformat(), db.func.printf("%+d days", OnboardingTemplateItem.offset_days))
+    source = db.select(
+        db.literal(employee_id),
+        OnboardingTemplateItem.title,
+        db.literal("open"),
+        due,
+        OnboardingTemplateItem.notes,
+        db.literal(datetime.utcnow(), db.DateTime),
+    ).where(OnboardingTemplateItem.template_id == template_id)
+    result = db.session.execute(
+        db.insert(OnboardingTask).from_select(
+            ["employee_id", "title", "status", "due_date", "notes", "created_at"], source
+        )
+    )
+    return result.rowcount
+
+
+def sla_summary(today: Optional[date] = None, overdue_limit: int = 50) -> Dict[str, Any]:
+    """Overdue and upcoming onboarding work, read through the (status, due_date) index."""
+    today = today or date.today()
+    week = today + timedelta(days=7)
+    open_tasks = OnboardingTask.status.in_(OPEN_STATUSES)
+
+    # Counts come straight off the covering index; no task rows are read.
+    buckets = {
+        "overdue_8_plus": OnboardingTask.due_date < today - timedelta(days=7),
+        "overdue_4_7": OnboardingTask.due_date.between(today - timedelta(days=7), today - timedelta(days=4)),
+        "overdue_1_3": OnboardingTask.due_date.between(today - timedelta(days=3), today - timedelta(days=1)),
+        "due_today": OnboardingTask.due_date == today,
+        "due_this_week": OnboardingTask.due_date.between(today + timedelta(days=1), week),
+        "no_due_date": OnboardingTask.due_date.is_(None),
+    }
+    rows = db.session.execute(
+        db.select(
+            OnboardingTask.status,
+            db.func.count().label("open"),
+            *(db.func.sum(db.case((clause, 1), else_=0)).label(name) for name, clause in buckets.items()),
+        )
+        .where(open_tasks)
+        .group_by(OnboardingTask.status)
+    ).all()
+    by_status = {row.status: {key: row._mapping[key] or 0 for key in ["open", *buckets]} for row in rows}
+    totals = {key: sum(item[key] for item in by_status.values()) for key in ["open", *buckets]}
+    totals["overdue"] = totals["overdue_1_3"] + totals["overdue_4_7"] + totals["overdue_8_plus"]
+
+    overdue = open_tasks & (OnboardingTask.due_date < today)
+    department = db.func.coalesce(Department.name, "Unassigned")
+    by_department = db.session.execute(
+        db.select(department.label("department"), db.func.count().label("overdue"))
+        .select_from(OnboardingTask)
+        .join(Employee, Employee.id == OnboardingTask.employee_id)
+        .outerjoin(Department, Department.id == Employee.department_id)
+        .where(overdue)
+        .group_by(department)
+        .order_by(db.func.count().desc())
+    ).all()
+    oldest = (
+        OnboardingTask.query.options(db.joinedload(OnboardingTask.employee))
+        .filter(overdue)
+        .order_by(OnboardingTask.due_date.asc())
+        .limit(overdue_limit)
+        .all()
+    )
+    return {
+        "today": today,
+        "totals": totals,
+        "by_status": by_status,
+        "by_department": by_department,
+        "oldest": oldest,
+    }
@@ -0,0 +1,216 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+from . import db
+from .models import AttendanceBitmap, Department, Employee
+from .versioning import bump_tables
+
+# attendance_bitmap keeps one integer per status per employee-month, bit
+# (day - 1) set when that day has a log with the status. Triggers keep it in
+# step with attendance_log so every writer (forms, kiosk, seed, API) is covered.
+STATUSES = ("present", "remote", "absent", "leave")
+
+_DAY_BIT = "(1 << (CAST(strftime('%d', {row}.work_date) AS INTEGER) - 1))"
+_MONTH = "date({row}.work_date, 'start of month')"
+
+
+def _refresh_cell(row: str) -> str:
+    # Recompute one day from the log so duplicate or edited logs stay exact.
+    bit = _DAY_BIT.format(row=row)
+    month = _MONTH.format(row=row)
+    assignments = ",\n".join(
+        f"""            {status} = ({status} & ~{bit}) | CASE WHEN EXISTS (
+                SELECT 1 FROM attendance_log
+                WHERE employee_id = {row}.employee_id AND work_date = {row}.work_date AND status = '{status}'
+            ) THEN {bit} ELSE 0 END"""
+        for status in STATUSES
+    )
+    return f"""
+        UPDATE attendance_bitmap SET
+{assignments}
+        WHERE employee_id = {row}.employee_id AND month = {month};"""
+
+
+def _upsert_cell(row: str) -> str:
+    bit = _DAY_BIT.format(row=row)
+    values = ", ".join(f"CASE WHEN {row}.status = '{status}' THEN {bit} ELSE 0 END" for status in STATUSES)
+    updates = ", ".join(f"{status} = {status} | excluded.{status}" for status in STATUSES)
+    return f"""
+        INSERT INTO attendance_bitmap (employee_id, month, {", ".join(STATUSES)})
+        VALUES ({row}.employee_id, {_MONTH.format(row=row)}, {values})
+        ON CONFLICT (employee_id, month) DO UPDATE SET {updates};"""
+
+
+_BITMAP_DDL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS attendance_bitmap_ai AFTER INSERT ON attendance_log BEGIN
+        {_upsert_cell("new")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS attendance_bitmap_ad AFTER DELETE ON attendance_log BEGIN
+        {_refresh_cell("old")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS attendance_bitmap_au
+    AFTER UPDATE OF employee_id, work_date, status ON attendance_log BEGIN
+        {_refresh_cell("old")}
+        {_upsert_cell("new")}
+    END
+    """,
+]
+
+_BACKFILL_BITMAPS = f"""
+    INSERT OR IGNORE INTO attendance_bitmap (employee_id, month, {", ".join(STATUSES)})
+    SELECT employee_id, {_MONTH.format(row="attendance_log")},
+        {", ".join(
+            f"SUM(DISTINCT CASE WHEN status = '{status}' THEN {_DAY_BIT.format(row='attendance_log')} ELSE 0 END)"
+            for status in STATUSES
+        )}
+    FROM attendance_log
+    GROUP BY employee_id, {_MONTH.format(row="attendance_log")}
+"""
+
+
+@event.listens_for(db.metadata, "after_create")
+def _install_bitmaps(target, connection, **kw):
+    if connection.dialect.name != "sqlite":
+        return
+    for ddl in _BITMAP_DDL:
+        connection.exec_driver_sql(ddl)
+    connection.exec_driver_sql(_BACKFILL_BITMAPS)
+
+
+def rebuild_bitmaps() -> None:
+    db.session.execute(text("DELETE FROM attendance_bitmap"))
+    db.session.execute(text(_BACKFILL_BITMAPS))
+    bump_tables(db.session.connection(), ["attendance_bitmap"])
+    db.session.commit()
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _range_masks(start: date, end: date) -> Dict[date, tuple]:
+    """month -> (mask of days inside [start, end], bit offset from ``start``'s month)."""
+    masks = {}
+    month, offset = _month_start(start), 0
+    while month <= end:
+        days = (_next_month(month) - month).days
+        first = start.day if month == _month_start(start) else 1
+        last = end.day if month == _month_start(end) else days
+        masks[month] = (((1 << last) - 1) ^ ((1 << (first - 1)) - 1), offset)
+        month, offset = _next_month(month), offset + days
+    return masks
+
+
+def _bitmap_rows(start: date, end: date, department_id: Optional[int] = None):
+    query = (
+        db.select(
+            AttendanceBitmap.employee_id,
+            AttendanceBitmap.month,
+            *(getattr(AttendanceBitmap, status) for status in STATUSES),
+            Employee.first_name,
+            Employee.last_name,
+            Employee.department_id,
+        )
+        .join(Employee, Employee.id == AttendanceBitmap.employee_id)
+        .where(AttendanceBitmap.month.between(_month_start(start), _month_start(end)))
+    )
+    if department_id is not None:
+        query = query.where(Employee.department_id == department_id)
+    return db.session.execute(query)
+
+
+def presence_by_department(start: date, end: date) -> List[Dict[str, object]]:
+    """Logged and present (present or remote) days per department, by popcount."""
+    masks = _range_masks(start, end)
+    totals = defaultdict(lambda: {"employees": set(), "logged": 0, "present": 0})
+    for row in _bitmap_rows(start, end):
+        mask, _ = masks[row.month]
+        logged = (row.present | row.remote | row.absent | row.leave) & mask
+        if not logged:
+            continue
+        bucket = totals[row.department_id]
+        bucket["employees"].add(row.employee_id)
+        bucket["logged"] += logged.bit_count()
+        bucket["present"] += ((row.present | row.remote) & mask).bit_count()
+
+    names = dict(db.session.execute(db.select(Department.id, Department.name)).all())
+    results = []
+    for department_id, bucket in totals.items():
+        results.append(
+            {
+                "department_id": department_id,
+                "department": names.get(department_id, "Unassigned"),
+                "employees": len(bucket["employees"]),
+                "logged": bucket["logged"],
+                "present": bucket["present"],
+                "rate": round(100 * bucket["present"] / bucket["logged"], 1) if bucket["logged"] else 0.0,
+            }
+        )
+    return sorted(results, key=lambda item: item["department"])
+
+
+def _longest_run(bits: int) -> int:
+    length = 0
+    while bits:
+        bits &= bits >> 1
+        length += 1
+    return length
+
+
+def longest_streaks(
+    start: date, end: date, statuses=("present", "remote"), department_id: Optional[int] = None, limit: int = 10
+) -> List[Dict[str, object]]:
+    """Longest run of consecutive calendar days per employee with any of ``statuses``."""
+    masks = _range_masks(start, end)
+    timelines: Dict[int, int] = defaultdict(int)
+    names = {}
+    for row in _bitmap_rows(start, end, department_id):
+        mask, offset = masks[row.month]
+        bits = 0
+        for status in statuses:
+            bits |= getattr(row, status)
+        timelines[row.employee_id] |= (bits & mask) << offset
+        names[row.employee_id] = f"{row.first_name} {row.last_name or ''}".strip()
+
+    streaks = [
+        {"employee_id": employee_id, "name": names[employee_id], "days": _longest_run(bits)}
+        for employee_id, bits in timelines.items()
+    ]
+    streaks.sort(key=lambda item: (-item["days"], item["name"]))
+    return [item for item in streaks[:limit] if item["days"]]
+
+
+def storage_stats() -> Optional[Dict[str, Dict[str, int]]]:
+    """Rows and on-disk bytes (table plus its indexes) for the log and the bitmaps.
+
+    Returns None when SQLite was built without the dbstat virtual table.
+    """
+    stats = {}
+    for table in ("attendance_log", "attendance_bitmap"):
+        try:
+            size = db.session.execute(
+                text(
+                    "SELECT COALESCE(SUM(pgsize), 0) FROM dbstat "
+                    "WHERE name IN (SELECT name FROM sqlite_schema WHERE tbl_name = :table)"
+                ),
+                {"table": table},
+            ).scalar_one()
+        except OperationalError:
+            db.session.rollback()
+            return None
+        rows = db.session.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar_one()
+        stats[table] = {"rows": rows, "bytes": size}
+    return stats
@@ -0,0 +1,183 @@
+import cProfile
+import json
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from . import db
+from .utils import is_admin
+
+# Requests are profiled when PROFILER_ENABLED is set and either an admin adds
+# ?<PROFILER_QUERY_PARAM>=1 or the request falls inside PROFILER_SAMPLE_RATE.
+# Each capture is a pstats dump plus a JSON summary, newest PROFILER_KEEP kept.
+_PROFILE_ID = re.compile(r"^\d{8}T\d{6}-[0-9a-f]{8}$")
+TOP_FUNCTIONS = 30
+TOP_STATEMENTS = 20
+
+
+def profile_dir() -> Path:
+    path = Path(current_app.config["PROFILER_DIR"])
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _reason() -> Optional[str]:
+    config = current_app.config
+    if not config["PROFILER_ENABLED"] or request.endpoint in ("static", "assets"):
+        return None
+    if request.args.get(config["PROFILER_QUERY_PARAM"]) and is_admin():
+        return "requested"
+    rate = config["PROFILER_SAMPLE_RATE"]
+    if rate and random.random() < rate:
+        return "sampled"
+    return None
+
+
+def start_profile() -> None:
+    """before_request hook."""
+    reason = _reason()
+    if reason is None:
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # another profiler already owns this thread
+        return
+    g._profile = {"profiler": profiler, "reason": reason, "sql": {}, "started": time.perf_counter()}
+
+
+def finish_profile(response):
+    """after_request hook: stop the profiler and save the capture."""
+    state = g.pop("_profile", None)
+    if state is None:
+        return response
+    state["profiler"].disable()
+    elapsed = time.perf_counter() - state["started"]
+    profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    try:
+        directory = profile_dir()
+        state["profiler"].dump_stats(str(directory / f"{profile_id}.prof"))
+        summary = _summarise(profile_id, state, elapsed, response.status_code)
+        (directory / f"{profile_id}.json").write_text(json.dumps(summary))
+        _rotate(directory, current_app.config["PROFILER_KEEP"])
+    except OSError as err:
+        current_app.logger.warning("Profile not saved: %s", err)
+        return response
+    response.headers["X-Profile-Id"] = profile_id
+    return response
+
+
+def discard_profile(exc=None) -> None:
+    """teardown_request hook, in case the request never reached after_request."""
+    state = g.pop("_profile", None)
+    if state is not None:
+        state["profiler"].disable()
+
+
+def _summarise(profile_id: str, state: Dict[str, Any], elapsed: float, status: int) -> Dict[str, Any]:
+    stats = pstats.Stats(state["profiler"])
+    functions = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        functions.append(
+            {
+                "function": name,
+                "location": f"{_short_path(filename)}:{line}" if line else filename,
+                "calls": calls,
+                "tottime_ms": round(tottime * 1000, 2),
+                "cumtime_ms": round(cumtime * 1000, 2),
+            }
+        )
+    functions.sort(key=lambda item: -item["cumtime_ms"])
+    statements = sorted(state["sql"].values(), key=lambda item: -item["total_ms"])
+    user = g.get("user")
+    return {
+        "id": profile_id,
+        "captured_at": datetime.utcnow().isoformat() + "Z",
+        "reason": state["reason"],
+        "method": request.method,
+        "path": request.full_path.rstrip("?"),
+        "endpoint": request.endpoint,
+        "status": status,
+        "user": user.email if user else None,
+        "duration_ms": round(elapsed * 1000, 2),
+        "sql_count": sum(item["count"] for item in statements),
+        "sql_ms": round(sum(item["total_ms"] for item in statements), 2),
+        "functions": functions[:TOP_FUNCTIONS],
+        "statements": [dict(item, total_ms=round(item["total_ms"], 2)) for item in statements[:TOP_STATEMENTS]],
+    }
+
+
+def _short_path(filename: str) -> str:
+    for marker in ("site-packages" + os.sep, "app" + os.sep):
+        if marker in filename:
+            return filename[filename.rindex(marker) :]
+    return filename
+
+
+def _rotate(directory: Path, keep: int) -> None:
+    captures = sorted(directory.glob("*.json"))
+    for summary in captures[: max(len(captures) - keep, 0)]:
+        summary.unlink(missing_ok=True)
+        summary.with_suffix(".prof").unlink(missing_ok=True)
+
+
+def install_sql_timing(engine) -> None:
+    """Time statements issued while the current request is being profiled."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        # Kept on the execution context, so a statement that raises leaves nothing behind.
+        if context is not None and has_request_context() and "_profile" in g:
+            context._profile_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_profile_started", None)
+        if started is None or not (has_request_context() and "_profile" in g):
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+        entry = g._profile["sql"].setdefault(statement, {"statement": statement, "count": 0, "total_ms": 0.0})
+        entry["count"] += 1
+        entry["total_ms"] += elapsed
+
+
+def list_profiles(limit: int = 200) -> List[Dict[str, Any]]:
+    """Saved captures, newest first, without their function and SQL tables."""
+    directory = profile_dir()
+    profiles = []
+    for path in sorted(directory.glob("*.json"), reverse=True)[:limit]:
+        try:
+            summary = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        summary.pop("functions", None)
+        summary.pop("statements", None)
+        profiles.append(summary)
+    return profiles
+
+
+def load_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    path = profile_dir() / f"{profile_id}.json"
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def init_app(app) -> None:
+    app.before_request(start_profile)
+    app.after_request(finish_profile)
+    app.teardown_request(discard_profile)
+    with app.app_context():
+        install_sql_timing(db.engine)
@@ -0,0 +1,158 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, text
+
+from . import db
+from .models import Employee, Recognition, RecognitionTally
+from .versioning import bump_tables
+
+# recognition_tally holds running counts per leaderboard period; triggers add
+# or subtract one per recognition so every writer (forms, API, seed) is
+# covered and a leaderboard read only touches the current period's rows.
+PERIODS = ("week", "month", "all")
+ALL_TIME = date(1970, 1, 1)
+
+_PERIOD_STARTS = {
+    "week": "date({ts}, '-6 days', 'weekday 1')",
+    "month": "date({ts}, 'start of month')",
+    "all": f"'{ALL_TIME.isoformat()}'",
+}
+_KEYS = {
+    "employee": "CAST({row}.employee_id AS TEXT)",
+    "badge": "NULLIF(TRIM({row}.badge), '')",
+}
+
+
+def _tally(row: str, delta: int) -> str:
+    ts = f"COALESCE({row}.created_at, CURRENT_TIMESTAMP)"
+    periods = " UNION ALL ".join(
+        f"SELECT '{period}' AS period, {start.format(ts=ts)} AS start" for period, start in _PERIOD_STARTS.items()
+    )
+    keys = " UNION ALL ".join(f"SELECT '{kind}' AS kind, {key.format(row=row)} AS key" for kind, key in _KEYS.items())
+    return f"""
+        INSERT INTO recognition_tally (period, period_start, kind, key, count)
+        SELECT p.period, p.start, k.kind, k.key, {delta} FROM ({periods}) AS p, ({keys}) AS k
+        WHERE k.key IS NOT NULL
+        ON CONFLICT (period, period_start, kind, key) DO UPDATE SET count = count + excluded.count;"""
+
+
+_TALLY_DDL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS recognition_tally_ai AFTER INSERT ON recognition BEGIN
+        {_tally("new", 1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS recognition_tally_ad AFTER DELETE ON recognition BEGIN
+        {_tally("old", -1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS recognition_tally_au
+    AFTER UPDATE OF employee_id, badge, created_at ON recognition BEGIN
+        {_tally("old", -1)}
+        {_tally("new", 1)}
+    END
+    """,
+]
+
+_BACKFILL_TALLY = "INSERT OR IGNORE INTO recognition_tally (period, period_start, kind, key, count)\n" + "\nUNION ALL\n".join(
+    f"""    SELECT '{period}', {start.format(ts="created_at")}, '{kind}', {key.format(row="recognition")}, COUNT(*)
+    FROM recognition WHERE created_at IS NOT NULL AND {key.format(row="recognition")} IS NOT NULL
+    GROUP BY 2, 4"""
+    for period, start in _PERIOD_STARTS.items()
+    for kind, key in _KEYS.items()
+)
+
+
+@event.listens_for(db.metadata, "after_create")
+def _install_tally(target, connection, **kw):
+    if connection.dialect.name != "sqlite":
+        return
+    for ddl in _TALLY_DDL:
+        connection.exec_driver_sql(ddl)
+    connection.exec_driver_sql(_BACKFILL_TALLY)
+
+
+def rebuild_tally() -> None:
+    db.session.execute(text("DELETE FROM recognition_tally"))
+    db.session.execute(text(_BACKFILL_TALLY))
+    bump_tables(db.session.connection(), ["recognition_tally"])
+    db.session.commit()
+
+
+def period_start(period: str, today: Optional[date] = None) -> date:
+    # created_at is stored in UTC, so periods roll over on the UTC calendar.
+    today = today or datetime.utcnow().date()
+    if period == "week":
+        return today - timedelta(days=today.weekday())
+    if period == "month":
+        return today.replace(day=1)
+    return ALL_TIME
+
+
+def leaderboard(period: str = "week", kind: str = "employee", limit: int = 5, today: Optional[date] = None) -> List[Dict[str, object]]:
+    """Top recipients (or badges) for the current week, month or all time."""
+    rows = db.session.execute(
+        db.select(RecognitionTally.key, RecognitionTally.count)
+        .where(
+            RecognitionTally.period == period,
+            RecognitionTally.period_start == period_start(period, today),
+            RecognitionTally.kind == kind,
+            RecognitionTally.count > 0,
+        )
+        .order_by(RecognitionTally.count.desc(), RecognitionTally.key)
+        .limit(limit)
+    ).all()
+    if kind != "employee":
+        return [{"name": row.key, "count": row.count} for row in rows]
+    ids = [int(row.key) for row in rows]
+    names = {
+        row.id: f"{row.first_name} {row.last_name or ''}".strip()
+        for row in db.session.execute(
+            db.select(Employee.id, Employee.first_name, Employee.last_name).where(Employee.id.in_(ids))
+        )
+    }
+    return [{"employee_id": int(row.key), "name": names.get(int(row.key), "Unknown"), "count": row.count} for row in rows]
+
+
+def leaderboards(limit: int = 5, today: Optional[date] = None) -> Dict[str, Dict[str, List[Dict[str, object]]]]:
+    return {
+        period: {
+            "employees": leaderboard(period, "employee", limit, today),
+            "badges": leaderboard(period, "badge", limit, today),
+        }
+        for period in PERIODS
+    }
+
+
+def feed_cursor(rec: Recognition) -> str:
+    return f"{rec.created_at.isoformat()}_{rec.id}"
+
+
+def _parse_feed_cursor(raw: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    if not raw:
+        return None
+    try:
+        stamp, _, ident = raw.rpartition("_")
+        return datetime.fromisoformat(stamp), int(ident)
+    except ValueError:
+        return None
+
+
+def recognition_feed(before: Optional[str] = None, per_page: int = 20) -> Tuple[List[Recognition], Optional[str]]:
+    """One page of the feed, newest first, continuing after the ``before`` cursor."""
+    query = Recognition.query.options(db.joinedload(Recognition.employee))
+    cursor = _parse_feed_cursor(before)
+    if cursor:
+        before_at, before_id = cursor
+        query = query.filter(
+            db.or_(
+                Recognition.created_at < before_at,
+                db.and_(Recognition.created_at == before_at, Recognition.id < before_id),
+            )
+        )
+    rows = query.order_by(Recognition.created_at.desc(), Recognition.id.desc()).limit(per_page + 1).all()
+    items = rows[:per_page]
+    return items, feed_cursor(items[-1]) if len(rows) > per_page else None
@@ -0,0 +1,110 @@
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import aliased
+
+from . import db
+from .models import Department, Employee, PerformanceReview
+
+DONE_STATUS = "submitted"
+
+
+def open_review_cycle(period_start: date, period_end: date, department_id: Optional[int] = None) -> int:
+    """Create draft reviews for every active employee (optionally one department).
+
+    One INSERT ... SELECT; employees who already have a review for the same
+    period are skipped, so reopening a cycle is harmless. The reviewer
+    defaults to the employee's manager.
+    """
+    manager = aliased(Employee)
+    existing = (
+        db.select(PerformanceReview.id)
+        .where(
+            PerformanceReview.employee_id == Employee.id,
+            PerformanceReview.period_start == period_start,
+            PerformanceReview.period_end == period_end,
+        )
+        .exists()
+    )
+    source = (
+        db.select(
+            Employee.id,
+            (manager.first_name + " " + db.func.coalesce(manager.last_name, "")).label("reviewer"),
+            db.literal(period_start, db.Date),
+            db.literal(period_end, db.Date),
+            db.literal("draft"),
+            db.literal(datetime.utcnow(), db.DateTime),
+        )
+        .outerjoin(manager, manager.id == Employee.manager_id)
+        .where(Employee.status == "active", ~existing)
+    )
+    if department_id is not None:
+        source = source.where(Employee.department_id == department_id)
+    result = db.session.execute(
+        db.insert(PerformanceReview).from_select(
+            ["employee_id", "reviewer", "period_start", "period_end", "status", "created_at"], source
+        )
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def review_cycles() -> List[Dict[str, Any]]:
+    """Review counts and completion per period_end, newest first.
+
+    Reads only status and period_end, so SQLite answers it from the covering
+    (status, period_end) index without touching the table.
+    """
+    submitted = db.func.sum(db.case((PerformanceReview.status == DONE_STATUS, 1), else_=0))
+    rows = db.session.execute(
+        db.select(
+            PerformanceReview.period_end,
+            db.func.count(PerformanceReview.id).label("total"),
+            submitted.label("submitted"),
+        )
+        .group_by(PerformanceReview.period_end)
+        .order_by(PerformanceReview.period_end.desc())
+    ).all()
+    return [
+        {
+            "period_end": row.period_end,
+            "total": row.total,
+            "submitted": row.submitted,
+            "completion": round(100 * row.submitted / row.total, 1) if row.total else 0.0,
+        }
+        for row in rows
+    ]
+
+
+def rating_distribution(period_end: date, by: str = "department") -> Dict[str, Any]:
+    """Counts per (department or manager, rating) plus completion per group."""
+    rating = db.func.coalesce(db.func.nullif(db.func.trim(PerformanceReview.rating), ""), "Unrated")
+    if by == "manager":
+        manager = aliased(Employee)
+        group = db.func.coalesce(manager.first_name + " " + db.func.coalesce(manager.last_name, ""), "No manager")
+        target, onclause = manager, manager.id == Employee.manager_id
+    else:
+        group = db.func.coalesce(Department.name, "Unassigned")
+        target, onclause = Department, Department.id == Employee.department_id
+    rows = db.session.execute(
+        db.select(group.label("grp"), rating.label("rating"), PerformanceReview.status, db.func.count().label("n"))
+        .select_from(PerformanceReview)
+        .join(Employee, Employee.id == PerformanceReview.employee_id)
+        .outerjoin(target, onclause)
+        .where(PerformanceReview.period_end == period_end)
+        .group_by(group, rating, PerformanceReview.status)
+    ).all()
+
+    groups: Dict[str, Dict[str, Any]] = OrderedDict()
+    ratings = set()
+    for row in sorted(rows, key=lambda item: item.grp):
+        bucket = groups.setdefault(row.grp, {"ratings": defaultdict(int), "total": 0, "submitted": 0})
+        bucket["total"] += row.n
+        bucket["ratings"][row.rating] += row.n
+        ratings.add(row.rating)
+        if row.status == DONE_STATUS:
+            bucket["submitted"] += row.n
+    for bucket in groups.values():
+        bucket["completion"] = round(100 * bucket["submitted"] / bucket["total"], 1) if bucket["total"] else 0.0
+    return {"ratings": sorted(ratings), "groups": groups}
@@ -1,6 +1,8 @@
 import os
 from datetime import datetime, date, timedelta
-from flask import Blueprint, render_template, request, redirect, url_for, flash, g, jsonify
+import json
+import time
+from flask import Blueprint, Response, current_app, make_response, render_template, request, redirect, send_from_directory, url_for, flash, g, jsonify
 
 from . import db
 from .models import (
@@ -18,8 +20,26 @@ from .models import (
     OnboardingTask,
     BenefitEnrollment,
     Recognition,
+    Job,
+    MetricSnapshot,
+    OnboardingTemplate,
+    OnboardingTemplateItem,
+    User,
 )
-from .utils import login_required
+from . import jobs
+from .attendance import anomaly_thresholds, attendance_anomalies, dashboard_anomalies
+from .benefits import ROLLUPS, coverage_as_of, coverage_rollup, renew_enrollments
+from .ess import portal_payload
+from .health import check_database, readiness
+from .onboarding import default_template_id, instantiate_template, parse_template_items, sla_summary
+from .presence import longest_streaks, presence_by_department
+from .recognitions import leaderboards, recognition_feed
+from .reviews import open_review_cycle, rating_distribution, review_cycles
+from .utilization import department_project_matrix, employee_utilization
+from .metrics import monthly_trends, sparkline
+from .events import get_watcher, hub, message_payload, poke_watcher, stream_channel
+from .search import search_communications
+from .utils import conditional, login_required
 
 
 def _get_gemini_client():
@@ -39,11 +59,83 @@ def _get_gemini_client():
     model_id = os.getenv("GEMINI_MODEL", "gemini-3-flash-preview")
     return (client, model_id), None
 
+def _employee_options():
+    # Left unexecuted: the template only iterates it when the cached
+    # employee <option> fragment is stale.
+    return Employee.query.order_by(Employee.last_name.asc())
+
+
+def _wants_json() -> bool:
+    return request.is_json or request.accept_mimetypes.best == "application/json"
+
+
+def _bulk_set_status(model, raw_ids, status: str):
+    """Set ``status`` on many rows with one UPDATE in one transaction; returns per-id results."""
+    results = {}
+    ids = []
+    for raw in raw_ids:
+        try:
+            ids.append(int(raw))
+        except (TypeError, ValueError):
+            results[str(raw)] = "invalid"
+
+    found = set()
+    # Chunked only to stay under SQLite's bound-parameter limit; all chunks share the transaction.
+    for start in range(0, len(ids), 900):
+        chunk = ids[start:start + 900]
+        found.update(db.session.execute(db.select(model.id).where(model.id.in_(chunk))).scalars())
+        db.session.execute(
+            db.update(model).where(model.id.in_(chunk)).values(status=status),
+            execution_options={"synchronize_session": False},
+        )
+    db.session.commit()
+
+    for item_id in ids:
+        results[str(item_id)] = "updated" if item_id in found else "not_found"
+    return results
+
+
+def _bulk_payload():
+    """(ids, status) from a JSON object or a form; ([], None) when the JSON is malformed."""
+    payload = request.get_json(silent=True)
+    if payload is None:
+        return request.form.getlist("ids"), request.form.get("status")
+    if not isinstance(payload, dict):
+        return [], None
+    ids, status = payload.get("ids"), payload.get("status")
+    # A string would be iterated character by character, "12" -> ids 1 and 2.
+    if not isinstance(ids, list) or not isinstance(status, str):
+        return [], None
+    return ids, status
+
+
+def _message_cursor(msg: ChannelMessage) -> str:
+    return f"{msg.created_at.isoformat()}_{msg.id}"
+
+
+def _parse_message_cursor(raw):
+    if not raw:
+        return None
+    try:
+        stamp, _, ident = raw.rpartition("_")
+        return datetime.fromisoformat(stamp), int(ident)
+    except ValueError:
+        return None
+
+
+def _post_channel_message(channel: str, body: str, author: str) -> ChannelMessage:
+    msg = ChannelMessage(channel=channel, message=body, author=author)
+    db.session.add(msg)
+    db.session.commit()
+    poke_watcher()
+    return msg
+
 bp = Blueprint("main", __name__)
 
 
 @bp.route("/")
 @login_required
+@conditional(Employee, Department, TimeOffRequest, PayrollEntry, Project, AttendanceLog)
 def dashboard():
     employee_count = Employee.query.count()
     department_count = Department.query.count()
@@ -52,20 +144,31 @@ def dashboard():
     open_payroll = PayrollEntry.query.filter_by(status="scheduled").count()
     active_projects = Project.query.filter(Project.status != "done").count()
     todays_logs = AttendanceLog.query.filter_by(work_date=date.today()).count()
-    return render_template(
-        "dashboard.html",
-        employee_count=employee_count,
-        department_count=department_count,
-        pending_requests=pending_requests,
-        recent_requests=recent_requests,
-        open_payroll=open_payroll,
-        active_projects=active_projects,
-        todays_logs=todays_logs,
+    anomalies, anomalies_fresh = dashboard_anomalies()
+    response = make_response(
+        render_template(
+            "dashboard.html",
+            anomalies=anomalies,
+            anomalies_fresh=anomalies_fresh,
+            employee_count=employee_count,
+            department_count=department_count,
+            pending_requests=pending_requests,
+            recent_requests=recent_requests,
+            open_payroll=open_payroll,
+            active_projects=active_projects,
+            todays_logs=todays_logs,
+        )
     )
+    if not anomalies_fresh:
+        # The anomaly table lags the version counters, so this page must not
+        # be revalidated against them; the next load shows the fresh rows.
+        response.cache_control.no_store = True
+    return response
 
 
 @bp.route("/employees")
 @login_required
+@conditional(Employee, Role, Department)
 def employees():
     employees_list = Employee.query.order_by(Employee.last_name.asc()).all()
     roles = Role.query.order_by(Role.title.asc()).all()
@@ -84,6 +187,7 @@ def new_employee():
     roles = Role.query.order_by(Role.title.asc()).all()
     departments = Department.query.order_by(Department.name.asc()).all()
     managers = Employee.query.order_by(Employee.last_name.asc()).all()
+    templates = OnboardingTemplate.query.order_by(OnboardingTemplate.name.asc()).all()
 
     if request.method == "POST":
         first_name = request.form.get("first_name", "").strip()
@@ -107,6 +211,7 @@ def new_employee():
                 roles=roles,
                 departments=departments,
                 managers=managers,
+                templates=templates,
             )
 
         employee = Employee(
@@ -120,8 +225,16 @@ def new_employee():
             manager_id=manager_id,
         )
         db.session.add(employee)
+        db.session.flush()
+
+        template_choice = request.form.get("onboarding_template", "auto")
+        if template_choice == "auto":
+            template_id = default_template_id(employee.department_id and int(employee.department_id))
+        else:
+            template_id = int(template_choice) if template_choice.isdigit() else None
+        created = instantiate_template(template_id, employee.id, start_date) if template_id else 0
         db.session.commit()
-        flash("Employee created.", "success")
+        flash(f"Employee created with {created} onboarding task(s)." if created else "Employee created.", "success")
         return redirect(url_for("main.employees"))
 
     return render_template(
@@ -129,6 +242,7 @@ def new_employee():
         roles=roles,
         departments=departments,
         managers=managers,
+        templates=templates,
     )
 
 
@@ -226,16 +340,16 @@ def create_role():
 
 @bp.route("/time-off")
 @login_required
+@conditional(TimeOffRequest, Employee)
 def time_off_list():
     requests_list = TimeOffRequest.query.order_by(TimeOffRequest.created_at.desc()).all()
-    employees = Employee.query.order_by(Employee.last_name.asc()).all()
-    return render_template("timeoff/list.html", requests=requests_list, employees=employees)
+    return render_template("timeoff/list.html", requests=requests_list)
 
 
 @bp.route("/time-off/new", methods=["GET", "POST"])
 @login_required
 def time_off_new():
-    employees = Employee.query.order_by(Employee.last_name.asc()).all()
+    employees = _employee_options()
 
     if request.method == "POST":
         employee_id = request.form.get("employee_id")
@@ -285,8 +399,27 @@ def time_off_status(request_id: int):
     return redirect(url_for("main.time_off_list"))
 
 
+@bp.route("/time-off/bulk-status", methods=["POST"])
+@login_required
+def time_off_bulk_status():
+    ids, new_status = _bulk_payload()
+    if new_status not in {"pending", "approved", "declined"} or not ids:
+        if _wants_json():
+            return jsonify({"error": "Select requests and a valid status."}), 400
+        flash("Select requests and a valid status.", "danger")
+        return redirect(url_for("main.time_off_list"))
+
+    results = _bulk_set_status(TimeOffRequest, ids, new_status)
+    if _wants_json():
+        return jsonify({"status": new_status, "results": results})
+    updated = sum(1 for outcome in results.values() if outcome == "updated")
+    flash(f"{updated} of {len(results)} requests set to {new_status}.", "info")
+    return redirect(url_for("main.time_off_list"))
+
+
 @bp.route("/attendance")
 @login_required
+@conditional(AttendanceLog, Employee)
 def attendance_list():
     day = request.args.get("date")
     try:
@@ -299,8 +432,61 @@ def attendance_list():
         query = query.filter_by(work_date=filter_date)
 
     logs = query.all()
-    employees = Employee.query.order_by(Employee.last_name.asc()).all()
-    return render_template("attendance/list.html", logs=logs, employees=employees, filter_date=filter_date)
+    return render_template("attendance/list.html", logs=logs, filter_date=filter_date)
+
+
+@bp.route("/attendance/anomalies")
+@login_required
+@conditional(Employee, AttendanceLog)
+def attendance_anomalies_report():
+    def parse(value):
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+        except ValueError:
+            return None
+
+    end = parse(request.args.get("end")) or date.today()
+    start = parse(request.args.get("start")) or end - timedelta(days=current_app.config["ATTENDANCE_ANOMALY_DAYS"])
+    thresholds = anomaly_thresholds()
+    casts = {
+        "late_after": lambda raw: datetime.strptime(raw, "%H:%M").strftime("%H:%M"),
+        "overtime_hours": float,
+        "absence_streak": int,
+    }
+    for key, cast in casts.items():
+        raw = request.args.get(key)
+        if raw:
+            try:
+                thresholds[key] = cast(raw)
+            except ValueError:
+                pass
+
+    rows = attendance_anomalies(start, end, **thresholds)
+    return render_template("attendance/anomalies.html", rows=rows, start=start, end=end, thresholds=thresholds)
+
+
+@bp.route("/attendance/presence")
+@login_required
+@conditional(Employee, Department, AttendanceLog)
+def attendance_presence():
+    def parse(value):
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+        except ValueError:
+            return None
+
+    end = parse(request.args.get("end")) or date.today()
+    start = parse(request.args.get("start")) or end - timedelta(days=90)
+    if start > end:
+        start, end = end, start
+    return render_template(
+        "attendance/presence.html",
+        start=start,
+        end=end,
+        departments=presence_by_department(start, end),
+        present_streaks=longest_streaks(start, end),
+        absence_streaks=longest_streaks(start, end, statuses=("absent",)),
+    )
 
 
 @bp.route("/attendance/new", methods=["GET", "POST"])
@@ -328,6 +514,10 @@ def attendance_new():
             flash("Employee is required.", "danger")
             return render_template("attendance/form.html", employees=employees)
 
+        if AttendanceLog.query.filter_by(employee_id=employee_id, work_date=work_date).first():
+            flash("That employee already has an attendance log for this day.", "danger")
+            return render_template("attendance/form.html", employees=employees)
+
         entry = AttendanceLog(
             employee_id=employee_id,
             work_date=work_date,
@@ -386,9 +576,20 @@ def attendance_delete(log_id: int):
 
 @bp.route("/communications", methods=["GET", "POST"])
 @login_required
+@conditional(Announcement, ChannelMessage)
 def communications():
     announcements = Announcement.query.order_by(Announcement.created_at.desc()).limit(10).all()
-    messages = ChannelMessage.query.order_by(ChannelMessage.created_at.desc()).limit(20).all()
+    # Grouped on the (channel, created_at) index, so this never reads message bodies.
+    channels = (
+        db.session.query(
+            ChannelMessage.channel,
+            db.func.count(ChannelMessage.id).label("message_count"),
+            db.func.max(ChannelMessage.created_at).label("last_message_at"),
+        )
+        .group_by(ChannelMessage.channel)
+        .order_by(db.func.max(ChannelMessage.created_at).desc())
+        .all()
+    )
 
     if request.method == "POST":
         kind = request.form.get("kind")
@@ -409,19 +610,136 @@ def communications():
             if not body:
                 flash("Message is required.", "danger")
             else:
-                db.session.add(ChannelMessage(channel=channel, message=body, author=author))
-                db.session.commit()
+                _post_channel_message(channel, body, author)
                 flash("Message sent.", "success")
                 return redirect(url_for("main.communications"))
 
-    return render_template("communications/list.html", announcements=announcements, messages=messages)
+    return render_template("communications/list.html", announcements=announcements, channels=channels)
+
+
+@bp.route("/communications/channels/<channel>", methods=["GET", "POST"])
+@login_required
+@conditional(ChannelMessage)
+def channel_messages(channel: str):
+    if request.method == "POST":
+        body = request.form.get("body", "").strip()
+        author = request.form.get("author", g.user.full_name if getattr(g, "user", None) else "System")
+        if not body:
+            flash("Message is required.", "danger")
+        else:
+            _post_channel_message(channel, body, author)
+            return redirect(url_for("main.channel_messages", channel=channel))
+
+    per_page = 50
+    query = ChannelMessage.query.filter(ChannelMessage.channel == channel)
+    cursor = _parse_message_cursor(request.args.get("before"))
+    if cursor:
+        before_at, before_id = cursor
+        query = query.filter(
+            db.or_(
+                ChannelMessage.created_at < before_at,
+                db.and_(ChannelMessage.created_at == before_at, ChannelMessage.id < before_id),
+            )
+        )
+    rows = query.order_by(ChannelMessage.created_at.desc(), ChannelMessage.id.desc()).limit(per_page + 1).all()
+    messages = rows[:per_page]
+    next_cursor = _message_cursor(messages[-1]) if len(rows) > per_page else None
+    return render_template(
+        "communications/channel.html",
+        channel=channel,
+        messages=messages,
+        next_cursor=next_cursor,
+        latest_id=max((msg.id for msg in messages), default=0) if not cursor else None,
+    )
+
+
+@bp.route("/communications/channels/<channel>/stream")
+@login_required
+def channel_stream(channel: str):
+    since_id = request.headers.get("Last-Event-ID", type=int) or request.args.get("since_id", type=int)
+
+    # Start the watcher, then take the hub position, before querying so posts
+    # committed meanwhile are not lost.
+    get_watcher()
+    position = hub.position(channel)
+    backlog = []
+    if since_id is not None:
+        rows = (
+            ChannelMessage.query.filter(ChannelMessage.channel == channel, ChannelMessage.id > since_id)
+            .order_by(ChannelMessage.id.asc())
+            .limit(current_app.config["SSE_BACKLOG_LIMIT"])
+            .all()
+        )
+        backlog = [message_payload(msg) for msg in rows]
+    # The app context (and its pooled DB connection) is torn down once this view
+    # returns; the generator below only waits on the in-process hub.
+    response = Response(
+        stream_channel(
+            channel,
+            backlog,
+            position,
+            current_app.config["SSE_HEARTBEAT_SECONDS"],
+            current_app.config["SSE_MAX_STREAM_SECONDS"],
+        ),
+        mimetype="text/event-stream",
+    )
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@bp.route("/communications/search")
+@login_required
+@conditional(Announcement, ChannelMessage)
+def communications_search():
+    query = request.args.get("q", "").strip()
+    channel = request.args.get("channel", "").strip() or None
+    author = request.args.get("author", "").strip() or None
+    page = request.args.get("page", 1, type=int) or 1
+
+    try:
+        since = datetime.strptime(request.args["since"], "%Y-%m-%d").date() if request.args.get("since") else None
+        until = datetime.strptime(request.args["until"], "%Y-%m-%d").date() if request.args.get("until") else None
+    except ValueError:
+        flash("Invalid date filter.", "danger")
+        since = until = None
+
+    results, has_more = search_communications(
+        query,
+        channel=channel,
+        author=author,
+        since=since,
+        until=until,
+        page=page,
+    )
+    return render_template(
+        "communications/search.html",
+        results=results,
+        has_more=has_more,
+        query=query,
+        channel=channel,
+        author=author,
+        since=since,
+        until=until,
+        page=page,
+    )
 
 
 @bp.route("/performance", methods=["GET", "POST"])
 @login_required
+@conditional(PerformanceReview, Employee)
 def performance():
-    employees = Employee.query.order_by(Employee.last_name.asc()).all()
-    reviews = PerformanceReview.query.order_by(PerformanceReview.period_end.desc()).all()
+    employees = _employee_options()
+    cycles = review_cycles()
+    cycle = request.args.get("cycle") or (cycles[0]["period_end"].isoformat() if cycles else "all")
+    reviews = PerformanceReview.query.order_by(PerformanceReview.period_end.desc())
+    if cycle != "all":
+        try:
+            reviews = reviews.filter(PerformanceReview.period_end == datetime.strptime(cycle, "%Y-%m-%d").date())
+        except ValueError:
+            cycle = "all"
+    reviews = reviews.all()
+    context = {"employees": employees, "reviews": reviews, "cycles": cycles, "cycle": cycle}
 
     if request.method == "POST":
         employee_id = request.form.get("employee_id")
@@ -438,11 +756,11 @@ def performance():
             period_end = datetime.strptime(period_end_raw, "%Y-%m-%d").date()
         except (TypeError, ValueError):
             flash("Invalid period dates.", "danger")
-            return render_template("performance/list.html", employees=employees, reviews=reviews)
+            return render_template("performance/list.html", **context)
 
         if not employee_id:
             flash("Employee is required.", "danger")
-            return render_template("performance/list.html", employees=employees, reviews=reviews)
+            return render_template("performance/list.html", **context)
 
         review = PerformanceReview(
             employee_id=employee_id,
@@ -459,7 +777,46 @@ def performance():
         flash("Performance review saved.", "success")
         return redirect(url_for("main.performance"))
 
-    return render_template("performance/list.html", employees=employees, reviews=reviews)
+    return render_template("performance/list.html", **context)
+
+
+@bp.route("/performance/cycles", methods=["GET", "POST"])
+@login_required
+@conditional(PerformanceReview, Employee, Department)
+def performance_cycles():
+    departments = Department.query.order_by(Department.name.asc()).all()
+    if request.method == "POST":
+        try:
+            period_start = datetime.strptime(request.form.get("period_start", ""), "%Y-%m-%d").date()
+            period_end = datetime.strptime(request.form.get("period_end", ""), "%Y-%m-%d").date()
+        except ValueError:
+            flash("Invalid period dates.", "danger")
+            return redirect(url_for("main.performance_cycles"))
+        if period_end < period_start:
+            flash("Period end must be after the start.", "danger")
+            return redirect(url_for("main.performance_cycles"))
+        department_id = request.form.get("department_id", type=int)
+        created = open_review_cycle(period_start, period_end, department_id)
+        flash(f"Opened {created} draft review(s).", "success")
+        return redirect(url_for("main.performance_cycles", cycle=period_end.isoformat()))
+
+    cycles = review_cycles()
+    by = "manager" if request.args.get("by") == "manager" else "department"
+    selected = None
+    if cycles:
+        try:
+            selected = datetime.strptime(request.args.get("cycle", ""), "%Y-%m-%d").date()
+        except ValueError:
+            selected = cycles[0]["period_end"]
+    distribution = rating_distribution(selected, by) if selected else None
+    return render_template(
+        "performance/cycles.html",
+        departments=departments,
+        cycles=cycles,
+        selected=selected,
+        by=by,
+        distribution=distribution,
+    )
 
 
 @bp.route("/performance/<int:review_id>/delete", methods=["POST"])
@@ -474,8 +831,9 @@ def performance_delete(review_id: int):
 
 @bp.route("/onboarding", methods=["GET", "POST"])
 @login_required
+@conditional(OnboardingTask, Employee)
 def onboarding():
-    employees = Employee.query.order_by(Employee.last_name.asc()).all()
+    employees = _employee_options()
     tasks = OnboardingTask.query.order_by(OnboardingTask.due_date.asc().nullslast()).all()
 
     if request.method == "POST":
@@ -506,6 +864,64 @@ def onboarding():
     return render_template("onboarding/list.html", employees=employees, tasks=tasks)
 
 
+@bp.route("/onboarding/templates", methods=["GET", "POST"])
+@login_required
+@conditional(OnboardingTemplate, OnboardingTemplateItem, Department, Employee)
+def onboarding_templates():
+    if request.method == "POST":
+        name = request.form.get("name", "").strip()
+        items = parse_template_items(request.form.get("items", ""))
+        if not name or not items:
+            flash("Name and at least one task are required.", "danger")
+            return redirect(url_for("main.onboarding_templates"))
+        if OnboardingTemplate.query.filter_by(name=name).first():
+            flash("A checklist with that name already exists.", "danger")
+            return redirect(url_for("main.onboarding_templates"))
+        template = OnboardingTemplate(name=name, department_id=request.form.get("department_id", type=int))
+        template.items = [OnboardingTemplateItem(offset_days=offset, title=title) for offset, title in items]
+        db.session.add(template)
+        db.session.commit()
+        flash(f"Checklist saved with {len(items)} task(s).", "success")
+        return redirect(url_for("main.onboarding_templates"))
+
+    templates = OnboardingTemplate.query.order_by(OnboardingTemplate.name.asc()).all()
+    departments = Department.query.order_by(Department.name.asc()).all()
+    return render_template(
+        "onboarding/templates.html",
+        templates=templates,
+        departments=departments,
+        employees=_employee_options(),
+    )
+
+
+@bp.route("/onboarding/templates/<int:template_id>/apply", methods=["POST"])
+@login_required
+def onboarding_template_apply(template_id: int):
+    OnboardingTemplate.query.get_or_404(template_id)
+    employee = Employee.query.get_or_404(request.form.get("employee_id", type=int) or 0)
+    created = instantiate_template(template_id, employee.id, employee.start_date)
+    db.session.commit()
+    flash(f"Added {created} task(s) for {employee.full_name()}.", "success")
+    return redirect(url_for("main.onboarding_templates"))
+
+
+@bp.route("/onboarding/templates/<int:template_id>/delete", methods=["POST"])
+@login_required
+def onboarding_template_delete(template_id: int):
+    template = OnboardingTemplate.query.get_or_404(template_id)
+    db.session.delete(template)
+    db.session.commit()
+    flash("Checklist deleted.", "info")
+    return redirect(url_for("main.onboarding_templates"))
+
+
+@bp.route("/onboarding/sla")
+@login_required
+@conditional(OnboardingTask, Employee, Department)
+def onboarding_sla():
+    return render_template("onboarding/sla.html", sla=sla_summary())
+
+
 @bp.route("/onboarding/<int:task_id>/delete", methods=["POST"])
 @login_required
 def onboarding_delete(task_id: int):
@@ -527,11 +943,53 @@ def onboarding_status(task_id: int):
     return redirect(url_for("main.onboarding"))
 
 
+@bp.route("/onboarding/bulk-status", methods=["POST"])
+@login_required
+def onboarding_bulk_status():
+    ids, new_status = _bulk_payload()
+    if new_status not in {"open", "in-progress", "blocked", "done"} or not ids:
+        if _wants_json():
+            return jsonify({"error": "Select tasks and a valid status."}), 400
+        flash("Select tasks and a valid status.", "danger")
+        return redirect(url_for("main.onboarding"))
+
+    results = _bulk_set_status(OnboardingTask, ids, new_status)
+    if _wants_json():
+        return jsonify({"status": new_status, "results": results})
+    updated = sum(1 for outcome in results.values() if outcome == "updated")
+    flash(f"{updated} of {len(results)} tasks set to {new_status}.", "info")
+    return redirect(url_for("main.onboarding"))
+
+
 @bp.route("/benefits", methods=["GET", "POST"])
 @login_required
+@conditional(BenefitEnrollment, Employee)
 def benefits():
-    employees = Employee.query.order_by(Employee.last_name.asc()).all()
-    enrollments = BenefitEnrollment.query.order_by(BenefitEnrollment.start_date.desc().nullslast()).all()
+    employees = _employee_options()
+    as_of = request.args.get("as_of") or date.today().isoformat()
+    by = request.args.get("by") if request.args.get("by") in ROLLUPS else "benefit_type"
+    if as_of == "all":
+        enrollments = (
+            BenefitEnrollment.query.options(db.joinedload(BenefitEnrollment.employee))
+            .order_by(BenefitEnrollment.start_date.desc().nullslast())
+            .all()
+        )
+        # A rollup needs a date; with every period listed it shows today's coverage, and says so.
+        rollup_date = date.today()
+    else:
+        try:
+            rollup_date = datetime.strptime(as_of, "%Y-%m-%d").date()
+        except ValueError:
+            as_of, rollup_date = date.today().isoformat(), date.today()
+        enrollments = coverage_as_of(rollup_date)
+    context = {
+        "employees": employees,
+        "enrollments": enrollments,
+        "as_of": as_of,
+        "by": by,
+        "rollup": coverage_rollup(rollup_date, by),
+        "rollup_date": rollup_date,
+    }
 
     if request.method == "POST":
         employee_id = request.form.get("employee_id")
@@ -547,11 +1005,11 @@ def benefits():
             end_date = datetime.strptime(end_raw, "%Y-%m-%d").date() if end_raw else None
         except ValueError:
             flash("Invalid dates.", "danger")
-            return render_template("benefits/list.html", employees=employees, enrollments=enrollments)
+            return render_template("benefits/list.html", **context)
 
         if not employee_id or not benefit_type:
             flash("Employee and benefit type are required.", "danger")
-            return render_template("benefits/list.html", employees=employees, enrollments=enrollments)
+            return render_template("benefits/list.html", **context)
 
         enrollment = BenefitEnrollment(
             employee_id=employee_id,
@@ -565,9 +1023,26 @@ def benefits():
         db.session.add(enrollment)
         db.session.commit()
         flash("Benefit enrollment saved.", "success")
-        return redirect(url_for("main.benefits"))
+        return redirect(url_for("main.benefits", as_of="all"))
 
-    return render_template("benefits/list.html", employees=employees, enrollments=enrollments)
+    return render_template("benefits/list.html", **context)
+
+
+@bp.route("/benefits/renew", methods=["POST"])
+@login_required
+def benefits_renew():
+    try:
+        period_end = datetime.strptime(request.form.get("period_end", ""), "%Y-%m-%d").date()
+        new_end = datetime.strptime(request.form.get("new_end", ""), "%Y-%m-%d").date()
+    except ValueError:
+        flash("Invalid renewal dates.", "danger")
+        return redirect(url_for("main.benefits"))
+    if new_end <= period_end:
+        flash("The new period must end after the current one.", "danger")
+        return redirect(url_for("main.benefits"))
+    renewed = renew_enrollments(period_end, new_end, request.form.get("benefit_type", "").strip() or None)
+    flash(f"Renewed {renewed} enrollment(s) through {new_end}.", "success")
+    return redirect(url_for("main.benefits", as_of=(period_end + timedelta(days=1)).isoformat()))
 
 
 @bp.route("/benefits/<int:enroll_id>/delete", methods=["POST"])
@@ -582,9 +1057,22 @@ def benefits_delete(enroll_id: int):
 
 @bp.route("/wellness", methods=["GET", "POST"])
 @login_required
+@conditional(Recognition, Employee)
 def wellness():
-    employees = Employee.query.order_by(Employee.last_name.asc()).all()
-    recognitions = Recognition.query.order_by(Recognition.created_at.desc()).all()
+    before = request.args.get("before")
+
+    def page():
+        # Feed and leaderboards are only built when a page is actually rendered,
+        # not for a successful submit that redirects.
+        recognitions, next_cursor = recognition_feed(before)
+        return render_template(
+            "wellness/list.html",
+            employees=_employee_options(),
+            recognitions=recognitions,
+            next_cursor=next_cursor,
+            before=before,
+            leaderboards=leaderboards(),
+        )
 
     if request.method == "POST":
         employee_id = request.form.get("employee_id")
@@ -593,14 +1081,18 @@ def wellness():
         message = request.form.get("message", "").strip()
         if not employee_id or not message:
             flash("Employee and message are required.", "danger")
-            return render_template("wellness/list.html", employees=employees, recognitions=recognitions)
+            return page()
         rec = Recognition(employee_id=employee_id, from_person=from_person, badge=badge, message=message)
         db.session.add(rec)
         db.session.commit()
         flash("Recognition sent.", "success")
         return redirect(url_for("main.wellness"))
 
-    return render_template("wellness/list.html", employees=employees, recognitions=recognitions)
+    if request.args.get("partial"):
+        # Infinite scroll asks for the next page as a bare fragment.
+        recognitions, next_cursor = recognition_feed(before)
+        return render_template("partials/recognition_feed.html", recognitions=recognitions, next_cursor=next_cursor, before=before)
+    return page()
 
 
 @bp.route("/wellness/<int:rec_id>/delete", methods=["POST"])
@@ -615,6 +1107,7 @@ def wellness_delete(rec_id: int):
 
 @bp.route("/reports")
 @login_required
+@conditional(Employee, TimeOffRequest, PayrollEntry, AttendanceLog, OnboardingTask, PerformanceReview, Recognition, BenefitEnrollment, MetricSnapshot, Department)
 def reports():
     employee_total = Employee.query.count()
     active_employees = Employee.query.filter_by(status="active").count()
@@ -642,35 +1135,58 @@ def reports():
         "benefits_active": benefits_active,
     }
 
-    return render_template("reports/summary.html", metrics=metrics)
+    department_id = request.args.get("department", type=int)
+    trends = monthly_trends(12, department_id)
+    sparklines = {
+        name: sparkline([month[name] for month in trends.values()])
+        for name in ("headcount", "attendance_rate", "payroll_paid", "recognitions")
+    }
+    departments = Department.query.order_by(Department.name.asc()).all()
+
+    return render_template(
+        "reports/summary.html",
+        metrics=metrics,
+        trends=trends,
+        sparklines=sparklines,
+        departments=departments,
+        department_id=department_id,
+    )
 
 
 @bp.route("/ess")
 @login_required
+@conditional(User, Employee, Department, Announcement, OnboardingTask, Recognition, TimeOffRequest, PayrollEntry)
 def ess():
-    employees = Employee.query.order_by(Employee.last_name.asc()).all()
-    recent_announcements = Announcement.query.order_by(Announcement.created_at.desc()).limit(3).all()
-    my_tasks = OnboardingTask.query.order_by(OnboardingTask.due_date.asc().nullslast()).limit(5).all()
-    recognitions = Recognition.query.order_by(Recognition.created_at.desc()).limit(5).all()
+    # Announcements render from a cached fragment, so the query stays lazy.
+    recent_announcements = Announcement.query.order_by(Announcement.created_at.desc()).limit(3)
     return render_template(
         "ess/portal.html",
-        employees=employees,
+        me=portal_payload(g.user),
         announcements=recent_announcements,
-        tasks=my_tasks,
-        recognitions=recognitions,
     )
 
 
+@bp.route("/system/live")
+def system_live():
+    # Liveness only proves the worker answers; it must never touch the database.
+    response = jsonify({"status": "ok"})
+    response.cache_control.no_store = True
+    return response
+
+
+@bp.route("/system/ready")
+def system_ready():
+    payload = readiness()
+    response = jsonify(payload)
+    response.status_code = 200 if payload["status"] == "ready" else 503
+    response.cache_control.no_store = True
+    return response
+
+
 @bp.route("/system/health")
 def system_health():
-    try:
-        db.session.execute(db.select(Employee).limit(1)).first()
-        db_ok = True
-    except Exception:
-        db_ok = False
-
     payload = {
-        "database": "ok" if db_ok else "error",
+        "database": check_database()["status"],
         "timestamp": datetime.utcnow().isoformat() + "Z",
     }
     return jsonify(payload)
@@ -678,6 +1194,7 @@ def system_health():
 
 @bp.route("/payroll")
 @login_required
+@conditional(PayrollEntry, Employee)
 def payroll_list():
     entries = PayrollEntry.query.order_by(PayrollEntry.pay_date.desc()).all()
     employees = Employee.query.order_by(Employee.last_name.asc()).all()
@@ -775,12 +1292,27 @@ def payroll_delete(entry_id: int):
 
 @bp.route("/projects")
 @login_required
+@conditional(Project, ProjectAssignment, Employee)
 def projects():
     projects_list = Project.query.order_by(Project.start_date.desc().nullslast(), Project.name).all()
-    employees = Employee.query.order_by(Employee.last_name.asc()).all()
+    employees = _employee_options()
     return render_template("projects/list.html", projects=projects_list, employees=employees)
 
 
+@bp.route("/projects/utilization")
+@login_required
+@conditional(Project, ProjectAssignment, Employee, Department)
+def project_utilization():
+    people = employee_utilization()
+    return render_template(
+        "projects/utilization.html",
+        people=people[:200],
+        people_total=len(people),
+        over_allocated=[person for person in people if person["over_allocated"]],
+        matrix=department_project_matrix(current_app.config["UTILIZATION_HEATMAP_PROJECTS"]),
+    )
+
+
 @bp.route("/projects/new", methods=["POST"])
 @login_required
 def project_new():
@@ -867,6 +1399,85 @@ def project_assign(project_id: int):
     return redirect(url_for("main.projects"))
 
 
+@bp.route("/jobs", methods=["GET", "POST"])
+@login_required
+def jobs_list():
+    if request.method == "POST":
+        try:
+            if request.is_json:
+                body = request.get_json(silent=True)
+                if not isinstance(body, dict) or not isinstance(body.get("payload") or {}, dict):
+                    raise ValueError("Expected a JSON object with a kind and an object payload.")
+                kind, payload = body.get("kind"), body.get("payload") or {}
+            else:
+                kind = request.form.get("kind")
+                payload = jobs.form_payload(kind, request.form)
+            record = jobs.enqueue(kind, payload)
+        except ValueError as err:
+            if _wants_json():
+                return jsonify({"error": str(err)}), 400
+            flash(str(err), "danger")
+            return redirect(url_for("main.jobs_list"))
+        if _wants_json():
+            return jsonify({"job_id": record.id, "status_url": url_for("main.job_status", job_id=record.id)}), 202
+        flash(f"Job #{record.id} queued.", "success")
+        return redirect(url_for("main.jobs_list"))
+
+    from .api import RESOURCES
+
+    recent = Job.query.order_by(Job.id.desc()).limit(50).all()
+    return render_template("jobs/list.html", jobs=recent, kinds=jobs.registered_kinds(), resources=sorted(RESOURCES))
+
+
+@bp.route("/jobs/<int:job_id>")
+@login_required
+def job_status(job_id: int):
+    return jsonify(Job.query.get_or_404(job_id).to_dict())
+
+
+@bp.route("/jobs/<int:job_id>/stream")
+@login_required
+def job_stream(job_id: int):
+    Job.query.get_or_404(job_id)
+    app = current_app._get_current_object()
+    interval = app.config["JOB_POLL_INTERVAL"]
+    deadline = time.monotonic() + app.config["SSE_MAX_STREAM_SECONDS"]
+
+    def generate():
+        last = None
+        # Past the deadline the stream ends and the browser reconnects.
+        while time.monotonic() < deadline:
+            # Short-lived context per poll so the stream never pins a connection.
+            with app.app_context():
+                record = db.session.get(Job, job_id)
+                state = record.to_dict() if record is not None else None
+            if state is None:
+                # Deleted mid-stream: tell the client, and don't let it reconnect into a 404 loop.
+                yield f"event: deleted\ndata: {json.dumps({'id': job_id})}\n\n"
+                return
+            if state != last:
+                yield f"data: {json.dumps(state)}\n\n"
+                last = state
+            if state["status"] in ("succeeded", "failed"):
+                return
+            time.sleep(interval)
+
+    response = Response(generate(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@bp.route("/jobs/<int:job_id>/download")
+@login_required
+def job_download(job_id: int):
+    record = Job.query.get_or_404(job_id)
+    result = json.loads(record.result) if record.result else {}
+    if record.status != "succeeded" or "file" not in result:
+        flash("No file for this job.", "warning")
+        return redirect(url_for("main.jobs_list"))
+    return send_from_directory(current_app.config["EXPORT_DIR"], result["file"], as_attachment=True)
+
+
 @bp.route("/api/chat", methods=["POST"])
 @login_required
 def chat_api():
@@ -877,6 +1488,11 @@ def chat_api():
 
     fallback = "Assistant is offline right now, but your request was received."
 
+    if current_app.config["CHAT_BACKEND"] == "stub":
+        # Canned reply after a model-like delay, for load tests and offline demos.
+        time.sleep(current_app.config["CHAT_STUB_LATENCY"])
+        return jsonify({"reply": f"(stub) You said: {message[:200]}"})
+
     client_tuple, err = _get_gemini_client()
     if err:
         return jsonify({"reply": fallback, "error": err}), 200
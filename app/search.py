@@ -0,0 +1,226 @@
+import os
+import re
+from datetime import date
+from typing import Optional
+
+from markupsafe import Markup, escape
+from sqlalchemy import event, text
+
+from . import db
+
+# FTS5 tables mirror Announcement and ChannelMessage using the source row id as
+# the FTS rowid, so the triggers below can keep them in sync with O(log n) writes.
+_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS announcement_fts USING fts5(
+        title, body, author UNINDEXED, created_at UNINDEXED,
+        tokenize = 'porter unicode61'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS channel_message_fts USING fts5(
+        message, channel UNINDEXED, author UNINDEXED, created_at UNINDEXED,
+        tokenize = 'porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS announcement_fts_ai AFTER INSERT ON announcement BEGIN
+        INSERT INTO announcement_fts (rowid, title, body, author, created_at)
+        VALUES (new.id, new.title, new.body, new.author, new.created_at);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS announcement_fts_ad AFTER DELETE ON announcement BEGIN
+        DELETE FROM announcement_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS announcement_fts_au AFTER UPDATE ON announcement BEGIN
+        DELETE FROM announcement_fts WHERE rowid = old.id;
+        INSERT INTO announcement_fts (rowid, title, body, author, created_at)
+        VALUES (new.id, new.title, new.body, new.author, new.created_at);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS channel_message_fts_ai AFTER INSERT ON channel_message BEGIN
+        INSERT INTO channel_message_fts (rowid, message, channel, author, created_at)
+        VALUES (new.id, new.message, new.channel, new.author, new.created_at);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS channel_message_fts_ad AFTER DELETE ON channel_message BEGIN
+        DELETE FROM channel_message_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS channel_message_fts_au AFTER UPDATE ON channel_message BEGIN
+        DELETE FROM channel_message_fts WHERE rowid = old.id;
+        INSERT INTO channel_message_fts (rowid, message, channel, author, created_at)
+        VALUES (new.id, new.message, new.channel, new.author, new.created_at);
+    END
+    """,
+]
+
+_BACKFILL_ANNOUNCEMENTS = """
+    INSERT INTO announcement_fts (rowid, title, body, author, created_at)
+    SELECT id, title, body, author, created_at FROM announcement
+    WHERE id NOT IN (SELECT rowid FROM announcement_fts)
+"""
+
+_BACKFILL_MESSAGES = """
+    INSERT INTO channel_message_fts (rowid, message, channel, author, created_at)
+    SELECT id, message, channel, author, created_at FROM channel_message
+    WHERE id NOT IN (SELECT rowid FROM channel_message_fts)
+"""
+
+# Private-use markers survive HTML escaping and are swapped for <mark> afterwards.
+_HL_OPEN = "\x02"
+_HL_CLOSE = "\x03"
+_TOKEN_RE = re.compile(r"\w+\*?", re.UNICODE)
+
+
+@event.listens_for(db.metadata, "after_create")
+def _install_fts(target, connection, **kw):
+    if connection.dialect.name != "sqlite":
+        return
+    for ddl in _FTS_DDL:
+        connection.exec_driver_sql(ddl)
+    connection.exec_driver_sql(_BACKFILL_ANNOUNCEMENTS)
+    connection.exec_driver_sql(_BACKFILL_MESSAGES)
+
+
+_BACKFILL_ARCHIVED_MESSAGES = """
+    INSERT INTO channel_message_fts (rowid, message, channel, author, created_at)
+    SELECT id, message, channel, author, created_at FROM archive.channel_message
+    WHERE id NOT IN (SELECT rowid FROM channel_message_fts)
+"""
+
+
+def rebuild_index() -> None:
+    """Recreate the search index, including messages moved to the archive.
+
+    The tables and triggers are (re)installed first, so this also upgrades a
+    database created before search existed.
+    """
+    from .archive import archive_path
+
+    archive = archive_path() if db.engine.url.database else None
+    with db.engine.connect() as conn:
+        for ddl in _FTS_DDL:
+            conn.exec_driver_sql(ddl)
+        conn.exec_driver_sql("DELETE FROM announcement_fts")
+        conn.exec_driver_sql("DELETE FROM channel_message_fts")
+        conn.exec_driver_sql(_BACKFILL_ANNOUNCEMENTS)
+        conn.exec_driver_sql(_BACKFILL_MESSAGES)
+        conn.commit()
+        if not archive or not os.path.exists(archive):
+            return
+        conn.exec_driver_sql("ATTACH DATABASE ? AS archive", (archive,))
+        try:
+            archived = conn.exec_driver_sql(
+                "SELECT 1 FROM archive.sqlite_master WHERE type = 'table' AND name = 'channel_message'"
+            ).scalar()
+            if archived:
+                conn.exec_driver_sql(_BACKFILL_ARCHIVED_MESSAGES)
+            conn.commit()
+        finally:
+            conn.rollback()
+            conn.exec_driver_sql("DETACH DATABASE archive")
+
+
+def _match_expression(query: str) -> Optional[str]:
+    # Quote every token so user input can never be parsed as FTS5 syntax;
+    # a trailing * is kept as a prefix search.
+    terms = []
+    for token in _TOKEN_RE.findall(query or ""):
+        prefix = token.endswith("*")
+        word = token.rstrip("*")
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms) or None
+
+
+def _mark(value: Optional[str]) -> Markup:
+    escaped = str(escape(value or ""))
+    return Markup(escaped.replace(_HL_OPEN, "<mark>").replace(_HL_CLOSE, "</mark>"))
+
+
+def search_communications(
+    query: str,
+    channel: Optional[str] = None,
+    author: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    page: int = 1,
+    per_page: int = 20,
+):
+    """Return (results, has_more) for a ranked search over announcements and messages."""
+    match = _match_expression(query)
+    if not match:
+        return [], False
+
+    params = {
+        "match": match,
+        "open": _HL_OPEN,
+        "close": _HL_CLOSE,
+        "limit": per_page + 1,
+        "offset": (max(page, 1) - 1) * per_page,
+    }
+    filters = []
+    if author:
+        filters.append("author = :author")
+        params["author"] = author
+    if since:
+        filters.append("created_at >= :since")
+        params["since"] = since.isoformat()
+    if until:
+        # created_at is stored as "YYYY-MM-DD HH:MM:SS", so compare against the next day
+        filters.append("created_at < date(:until, '+1 day')")
+        params["until"] = until.isoformat()
+    extra = "".join(f" AND {clause}" for clause in filters)
+
+    message_channel = ""
+    if channel:
+        message_channel = " AND channel = :channel"
+        params["channel"] = channel
+
+    parts = []
+    if not channel:
+        parts.append(
+            f"""
+            SELECT 'announcement' AS kind, rowid AS id,
+                   highlight(announcement_fts, 0, :open, :close) AS title,
+                   snippet(announcement_fts, 1, :open, :close, '…', 16) AS snippet,
+                   NULL AS channel, author, created_at,
+                   bm25(announcement_fts, 4.0, 1.0) AS rank
+            FROM announcement_fts
+            WHERE announcement_fts MATCH :match{extra}
+            """
+        )
+    parts.append(
+        f"""
+        SELECT 'message' AS kind, rowid AS id,
+               NULL AS title,
+               snippet(channel_message_fts, 0, :open, :close, '…', 16) AS snippet,
+               channel, author, created_at,
+               bm25(channel_message_fts) AS rank
+        FROM channel_message_fts
+        WHERE channel_message_fts MATCH :match{message_channel}{extra}
+        """
+    )
+    sql = " UNION ALL ".join(parts) + " ORDER BY rank LIMIT :limit OFFSET :offset"
+
+    rows = db.session.execute(text(sql), params).mappings().all()
+    results = [
+        {
+            "kind": row["kind"],
+            "id": row["id"],
+            "title": _mark(row["title"]) if row["title"] is not None else None,
+            "snippet": _mark(row["snippet"]),
+            "channel": row["channel"],
+            "author": row["author"],
+            "created_at": (row["created_at"] or "")[:16],
+        }
+        for row in rows[:per_page]
+    ]
+    return results, len(rows) > per_page
@@ -378,4 +378,7 @@ def seed_data() -> None:
         if r["employee"]:
             db.session.add(Recognition(**r))
 
+    # Give the demo login a self-service portal of its own.
+    admin.employee = soumendra
+
     db.session.commit()
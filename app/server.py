@@ -0,0 +1,79 @@
+import os
+from typing import Any, Dict
+
+from . import db
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # optional: `flask serve` needs it, `flask run` does not
+    BaseApplication = None
+
+# Gunicorn settings `flask serve` fills from SERVER_* config (or its options).
+# Any other gunicorn setting can still be passed via GUNICORN_CMD_ARGS.
+SETTINGS = {
+    "bind": "SERVER_BIND",
+    "workers": "SERVER_WORKERS",
+    "threads": "SERVER_THREADS",
+    "preload_app": "SERVER_PRELOAD",
+    "max_requests": "SERVER_MAX_REQUESTS",
+    "max_requests_jitter": "SERVER_MAX_REQUESTS_JITTER",
+    "keepalive": "SERVER_KEEPALIVE",
+    "timeout": "SERVER_TIMEOUT",
+    "graceful_timeout": "SERVER_GRACEFUL_TIMEOUT",
+}
+
+
+def server_options(app, **overrides) -> Dict[str, Any]:
+    """Gunicorn settings from config, with non-None ``overrides`` on top."""
+    options = {setting: app.config[key] for setting, key in SETTINGS.items()}
+    options.update({setting: value for setting, value in overrides.items() if value is not None})
+    if not options["workers"]:
+        options["workers"] = os.cpu_count() or 1
+    # The gthread worker keeps idle keep-alive connections and SSE streams
+    # off the request threads; the plain sync worker would ignore keepalive.
+    options["worker_class"] = "gthread"
+    return options
+
+
+def _post_fork(server, worker) -> None:
+    # A preloaded app may have opened pooled SQLite connections in the master;
+    # each worker starts with an empty pool instead of sharing those handles.
+    app = server.app.application
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def serve(app, **overrides) -> None:
+    """Run ``app`` under gunicorn until the master is stopped.
+
+    Signals are gunicorn's own: HUP starts fresh workers and retires the old
+    ones once their requests finish, TTIN/TTOU add or remove a worker, and
+    TERM shuts down gracefully.
+    """
+    if BaseApplication is None:
+        raise RuntimeError("gunicorn is not installed; run `pip install gunicorn` to use `flask serve`.")
+    options = server_options(app, **overrides)
+
+    class Server(BaseApplication):
+        def __init__(self):
+            self.application = app
+            super().__init__()
+
+        def load_config(self):
+            for name, value in options.items():
+                self.cfg.set(name, value)
+            self.cfg.set("post_fork", _post_fork)
+            env_args = self.cfg.parser().parse_args(self.cfg.get_cmd_args_from_env())
+            for name, value in vars(env_args).items():
+                if value is not None and name != "args":
+                    self.cfg.set(name.lower(), value)
+
+        def load(self):
+            if self.cfg.preload_app:
+                return self.application
+            # Without preloading each worker builds its own app after the fork.
+            from . import create_app
+
+            return create_app()
+
+    Server().run()
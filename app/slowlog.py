@@ -0,0 +1,178 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from logging.handlers import WatchedFileHandler
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+from . import db
+
+# Statements slower than SLOW_QUERY_MS are appended as JSON lines to a log, each
+# with its parameter types (values only with SLOW_QUERY_LOG_PARAMS), the Flask
+# endpoint that issued it and SQLite's EXPLAIN QUERY PLAN. The admin page groups
+# the lines by fingerprint. Every worker process appends to the same file, so
+# rotation is left to logrotate; WatchedFileHandler reopens it after a move.
+logger = logging.getLogger("app.slow_queries")
+logger.propagate = False
+
+_LITERALS = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)"), "(?, ...)"),
+    (re.compile(r"\s+"), " "),
+]
+MAX_PARAMS_CHARS = 500
+
+_plans: Dict[str, List[str]] = {}
+_plans_lock = threading.Lock()
+
+
+def fingerprint(statement: str) -> str:
+    """Statement shape with literals and IN-list lengths removed."""
+    shape = statement
+    for pattern, replacement in _LITERALS:
+        shape = pattern.sub(replacement, shape)
+    return shape.strip()
+
+
+def _explain(cursor, statement: str, parameters) -> List[str]:
+    # Run on the same DBAPI connection so the plan sees the caller's schema and
+    # transaction; bypassing SQLAlchemy keeps these hooks from re-entering.
+    rows = cursor.connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+
+def is_full_scan(plan: List[str]) -> bool:
+    return any(line.strip().startswith("SCAN ") and " USING " not in line for line in plan)
+
+
+def _plan_for(key: str, cursor, statement: str, parameters) -> Optional[List[str]]:
+    # Plans are taken once per fingerprint per process; the shape decides the plan.
+    with _plans_lock:
+        if key in _plans:
+            return _plans[key]
+    try:
+        plan = _explain(cursor, statement, parameters)
+    except Exception:  # not explainable (PRAGMA, DDL, closed cursor...)
+        plan = None
+    with _plans_lock:
+        _plans[key] = plan
+    return plan
+
+
+def _describe_params(parameters, executemany: bool, values: bool) -> str:
+    # Bound values include password and token hashes and employee PII, so by
+    # default only their types reach the disk.
+    if executemany:
+        return f"{len(parameters)} rows"
+    if values:
+        return repr(parameters)
+    if isinstance(parameters, dict):
+        return repr({key: type(value).__name__ for key, value in parameters.items()})
+    return repr([type(value).__name__ for value in parameters or ()])
+
+
+def install(app) -> None:
+    threshold = app.config["SLOW_QUERY_MS"]
+    if not threshold:
+        return
+    path = Path(app.config["SLOW_QUERY_LOG"])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if not any(getattr(handler, "baseFilename", None) == str(path) for handler in logger.handlers):
+        handler = WatchedFileHandler(path)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+    with app.app_context():
+        engine = db.engine
+    sqlite = engine.dialect.name == "sqlite"
+    log_values = app.config["SLOW_QUERY_LOG_PARAMS"]
+
+    # The start time lives on the execution context, so a statement that
+    # raises (and never reaches after_cursor_execute) leaves nothing behind.
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._slow_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_slow_started", None)
+        if started is None:
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+        if elapsed < threshold:
+            return
+        shape = fingerprint(statement)
+        key = hashlib.sha1(shape.encode()).hexdigest()[:12]
+        plan = _plan_for(key, cursor, statement, parameters) if sqlite and not executemany else None
+        params = _describe_params(parameters, executemany, log_values)
+        entry = {
+            "at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "fingerprint": key,
+            "ms": round(elapsed, 2),
+            "endpoint": request.endpoint if has_request_context() else None,
+            "statement": statement,
+            "params": params[:MAX_PARAMS_CHARS],
+            "plan": plan,
+        }
+        logger.info(json.dumps(entry, default=str))
+
+
+def _log_files(path: Path) -> List[Path]:
+    files = [path] + sorted(path.parent.glob(path.name + ".*"), key=lambda item: item.name)
+    return [item for item in files if item.exists()]
+
+
+def slow_query_report(path: str, limit: int = 100) -> List[Dict[str, Any]]:
+    """Slow statements grouped by fingerprint, costliest (count x time) first."""
+    groups: Dict[str, Dict[str, Any]] = {}
+    for log_file in reversed(_log_files(Path(path))):  # oldest first so "latest" wins
+        with open(log_file, encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                group = groups.setdefault(
+                    entry["fingerprint"],
+                    {
+                        "fingerprint": entry["fingerprint"],
+                        "count": 0,
+                        "total_ms": 0.0,
+                        "max_ms": 0.0,
+                        "endpoints": Counter(),
+                        "plan": None,
+                    },
+                )
+                group["count"] += 1
+                group["total_ms"] += entry["ms"]
+                group["max_ms"] = max(group["max_ms"], entry["ms"])
+                group["endpoints"][entry.get("endpoint") or "(no request)"] += 1
+                group["last_seen"] = entry["at"]
+                group["statement"] = entry["statement"]
+                group["params"] = entry["params"]
+                group["plan"] = entry.get("plan") or group["plan"]
+    report = []
+    for group in groups.values():
+        group["avg_ms"] = round(group["total_ms"] / group["count"], 2)
+        group["total_ms"] = round(group["total_ms"], 2)
+        group["endpoints"] = group["endpoints"].most_common(5)
+        group["full_scan"] = is_full_scan(group["plan"] or [])
+        report.append(group)
+    report.sort(key=lambda item: -item["total_ms"])
+    return report[:limit]
@@ -0,0 +1,113 @@
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+
+from . import db
+from .cache import LRUCache
+from .models import Department, Employee, Project, ProjectAssignment
+from .versioning import data_version
+
+# Results are keyed on the table versions they read, so an entry is reused
+# until an assignment, project or employee changes and then simply ages out.
+_TABLES = ("project_assignment", "project", "employee", "department")
+_cache = LRUCache(maxsize=32)
+
+
+def _cached(name: str, build: Callable[[], Any], *args) -> Any:
+    key = (name, args, data_version(*_TABLES))
+    value = _cache.get(key)
+    if value is None:
+        value = build()
+        _cache.set(key, value)
+    return value
+
+
+def _open_assignments():
+    # A project counts until it is marked done, as on the dashboard.
+    return (
+        db.select(ProjectAssignment)
+        .join(Project, Project.id == ProjectAssignment.project_id)
+        .where(Project.status != "done")
+        .subquery()
+    )
+
+
+def employee_utilization() -> List[Dict[str, Any]]:
+    """Total allocation per employee across open projects, busiest first."""
+
+    def build():
+        assignments = _open_assignments()
+        total = db.func.coalesce(db.func.sum(assignments.c.allocation), 0)
+        rows = db.session.execute(
+            db.select(
+                Employee.id,
+                Employee.first_name,
+                Employee.last_name,
+                Department.name.label("department"),
+                total.label("allocation"),
+                db.func.count(assignments.c.id).label("projects"),
+            )
+            .join(assignments, assignments.c.employee_id == Employee.id)
+            .outerjoin(Department, Department.id == Employee.department_id)
+            .group_by(Employee.id)
+            .order_by(total.desc(), Employee.last_name)
+        ).all()
+        return [
+            {
+                "employee_id": row.id,
+                "name": f"{row.first_name} {row.last_name or ''}".strip(),
+                "department": row.department or "Unassigned",
+                "allocation": int(row.allocation),
+                "projects": row.projects,
+                "over_allocated": row.allocation > 100,
+            }
+            for row in rows
+        ]
+
+    return _cached("employees", build)
+
+
+def department_project_matrix(max_projects: int = 0) -> Dict[str, Any]:
+    """Allocation summed per (department, open project).
+
+    ``max_projects`` keeps only the most-allocated projects as columns (0 keeps
+    all); cells are returned sparse as ``{(department, project_id): percent}``.
+    """
+
+    def build():
+        assignments = _open_assignments()
+        department = db.func.coalesce(Department.name, "Unassigned")
+        rows = db.session.execute(
+            db.select(
+                department.label("department"),
+                assignments.c.project_id,
+                db.func.coalesce(db.func.sum(assignments.c.allocation), 0).label("allocation"),
+                db.func.count(db.distinct(assignments.c.employee_id)).label("people"),
+            )
+            .join(Employee, Employee.id == assignments.c.employee_id)
+            .outerjoin(Department, Department.id == Employee.department_id)
+            .group_by(department, assignments.c.project_id)
+        ).all()
+
+        project_totals: Dict[int, int] = defaultdict(int)
+        for row in rows:
+            project_totals[row.project_id] += int(row.allocation)
+        project_ids = sorted(project_totals, key=lambda pid: -project_totals[pid])
+        if max_projects:
+            project_ids = project_ids[:max_projects]
+        names = dict(
+            db.session.execute(db.select(Project.id, Project.name).where(Project.id.in_(project_ids))).all()
+        )
+        keep = set(project_ids)
+        cells = {
+            (row.department, row.project_id): {"allocation": int(row.allocation), "people": row.people}
+            for row in rows
+            if row.project_id in keep
+        }
+        return {
+            "departments": sorted({department for department, _ in cells}),
+            "projects": [{"id": pid, "name": names.get(pid, ""), "allocation": project_totals[pid]} for pid in project_ids],
+            "cells": cells,
+            "max_cell": max((cell["allocation"] for cell in cells.values()), default=0),
+        }
+
+    return _cached("matrix", build, max_projects)
@@ -1,6 +1,8 @@
+import hashlib
+from datetime import date
 from functools import wraps
 from typing import Callable, Any
-from flask import g, redirect, session, url_for, flash
+from flask import abort, current_app, g, make_response, redirect, request, session, url_for, flash
 
 from .models import User
 
@@ -19,3 +21,81 @@ def login_required(view: Callable[..., Any]):
         return view(**kwargs)
 
     return wrapped_view
+
+
+def is_admin(user=None) -> bool:
+    user = user if user is not None else g.get("user")
+    return bool(user) and user.email.lower() in {email.lower() for email in current_app.config["ADMIN_EMAILS"]}
+
+
+def admin_required(view: Callable[..., Any]):
+    @wraps(view)
+    @login_required
+    def wrapped_view(**kwargs):
+        if not is_admin():
+            abort(403)
+        return view(**kwargs)
+
+    return wrapped_view
+
+
+def conditional_response(tables, render: Callable[[], Any]):
+    """Return 304 when none of ``tables`` changed, otherwise ``render()`` with validators.
+
+    The ETag is derived from the table version counters plus everything else
+    the page varies on (URL, signed-in user, today's date, deployed build), so
+    the check costs one tiny query and runs before the view touches the database.
+    """
+    # Pending flash messages are part of the page, so never short-circuit them.
+    if request.method not in ("GET", "HEAD") or session.get("_flashes"):
+        return render()
+
+    from .versioning import table_versions
+
+    versions = table_versions(tables)
+    user = g.get("user")
+    seed = "|".join(
+        [
+            request.endpoint or "",
+            request.full_path,
+            str(user.id if user else ""),
+            date.today().isoformat(),
+            current_app.extensions.get("build_id", ""),
+        ]
+        + [f"{name}:{versions[name][0]}" for name in tables]
+    )
+    etag = hashlib.sha1(seed.encode()).hexdigest()
+    stamps = [stamp for _, stamp in versions.values() if stamp]
+    last_modified = max(stamps).replace(microsecond=0) if stamps else None
+
+    # Only the ETag covers the user and the date, so If-Modified-Since alone
+    # is never enough to answer 304.
+    not_modified = request.if_none_match.contains_weak(etag)
+
+    response = make_response("", 304) if not_modified else make_response(render())
+    # Views opt out with no-store when what they rendered lags the counters.
+    if response.status_code in (200, 304) and not response.cache_control.no_store:
+        # Weak: the tag names the data, not the bytes, so the identity, gzip
+        # and 304 responses all carry the same validator.
+        response.set_etag(etag, weak=True)
+        if last_modified:
+            response.last_modified = last_modified
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        response.vary.add("Cookie")
+        response.vary.add("Authorization")
+    return response
+
+
+def conditional(*models):
+    """Decorator form of :func:`conditional_response` for the tables of ``models``."""
+    tables = [model.__tablename__ for model in models]
+
+    def decorator(view: Callable[..., Any]):
+        @wraps(view)
+        def wrapped_view(**kwargs):
+            return conditional_response(tables, lambda: view(**kwargs))
+
+        return wrapped_view
+
+    return decorator
@@ -0,0 +1,81 @@
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from . import db
+from .models import TableVersion
+
+# Per-table change counters, bumped inside the writing transaction so they
+# commit (or roll back) together with the data they describe.
+_VERSION_TABLE = TableVersion.__tablename__
+
+
+def bump_tables(connection, tables: Iterable[str]) -> None:
+    names = sorted({name for name in tables if name != _VERSION_TABLE})
+    if not names:
+        return
+    now = datetime.utcnow()
+    stmt = sqlite_insert(TableVersion.__table__).values(
+        [{"name": name, "version": 1, "updated_at": now} for name in names]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"version": TableVersion.__table__.c.version + 1, "updated_at": stmt.excluded.updated_at},
+    )
+    connection.execute(stmt)
+    if has_app_context():
+        g.pop("_table_versions", None)
+
+
+def ensure_version_table(app) -> None:
+    """Create table_version on databases that predate it.
+
+    Every ORM write bumps a counter there, so without the table all writes
+    would fail until someone re-ran ``init-db``.
+    """
+    with app.app_context():
+        TableVersion.__table__.create(db.engine, checkfirst=True)
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_flushed(session, flush_context):
+    tables = {obj.__table__.name for obj in session.new}
+    tables.update(obj.__table__.name for obj in session.deleted)
+    tables.update(obj.__table__.name for obj in session.dirty if session.is_modified(obj))
+    bump_tables(session.connection(), tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bump_bulk(orm_execute_state):
+    # Bulk ORM statements (query.delete(), update(Model)...) bypass the flush.
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None:
+        bump_tables(orm_execute_state.session.connection(), [table.name])
+
+
+def table_versions(tables: Iterable[str]) -> Dict[str, Tuple[int, Optional[datetime]]]:
+    """Current (version, updated_at) per table, memoised for the request."""
+    cache = g.setdefault("_table_versions", {}) if has_app_context() else {}
+    missing = [name for name in tables if name not in cache]
+    if missing:
+        rows = db.session.execute(
+            db.select(TableVersion.name, TableVersion.version, TableVersion.updated_at).where(
+                TableVersion.name.in_(missing)
+            )
+        ).all()
+        found = {row.name: (row.version, row.updated_at) for row in rows}
+        for name in missing:
+            cache[name] = found.get(name, (0, None))
+    return {name: cache[name] for name in tables}
+
+
+def data_version(*tables: str) -> str:
+    """Version stamp for cache keys, e.g. ``data_version("employee")`` in templates."""
+    versions = table_versions(tables)
+    return ";".join(f"{name}={versions[name][0]}" for name in tables)
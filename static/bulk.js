@@ -0,0 +1,10 @@
+// Select-all toggles for bulk action tables: a checkbox with data-select-all="<form id>"
+// checks every row checkbox bound to that form.
+document.querySelectorAll('[data-select-all]').forEach((toggle) => {
+  const formId = toggle.dataset.selectAll;
+  toggle.addEventListener('change', () => {
+    document.querySelectorAll(`input[name="ids"][form="${formId}"]`).forEach((box) => {
+      box.checked = toggle.checked;
+    });
+  });
+});
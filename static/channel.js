@@ -0,0 +1,24 @@
+// Live channel feed: prepends posts streamed over Server-Sent Events to #channel-feed.
+(() => {
+  const feed = document.getElementById('channel-feed');
+  // Older pages are static; only the newest page follows the live stream.
+  if (feed.dataset.since === undefined) return;
+  const source = new EventSource(`${feed.dataset.stream}?since_id=${feed.dataset.since}`);
+  source.addEventListener('message', (e) => {
+    const msg = JSON.parse(e.data);
+    const empty = document.getElementById('channel-empty');
+    if (empty) empty.remove();
+    const item = document.createElement('div');
+    item.className = 'feature';
+    const inner = document.createElement('div');
+    const meta = document.createElement('div');
+    meta.className = 'muted';
+    meta.textContent = `${msg.author || 'System'} • ${msg.created_at}`;
+    const body = document.createElement('p');
+    body.className = 'muted';
+    body.textContent = msg.message;
+    inner.append(meta, body);
+    item.appendChild(inner);
+    feed.prepend(item);
+  });
+})();
@@ -0,0 +1,59 @@
+(() => {
+  const panel = document.getElementById('chat-panel');
+  const toggle = document.getElementById('chat-toggle');
+  const closeBtn = document.getElementById('chat-close');
+  const feed = document.getElementById('chat-feed');
+  const form = document.getElementById('chat-form');
+  const input = document.getElementById('chat-input');
+
+  const addMessage = (role, text) => {
+    const row = document.createElement('div');
+    row.className = `chat-row ${role}`;
+    const bubble = document.createElement('div');
+    bubble.className = 'chat-bubble';
+    bubble.innerHTML = (text || '').replace(/</g, '&lt;').replace(/\n/g, '<br>');
+    row.appendChild(bubble);
+    feed.appendChild(row);
+    feed.scrollTop = feed.scrollHeight;
+  };
+
+  const setLoading = (loading) => {
+    form.querySelector('button').disabled = loading;
+    input.disabled = loading;
+  };
+
+  addMessage('bot', 'How may I help you?');
+
+  const openPanel = () => panel.classList.add('open');
+  const closePanel = () => panel.classList.remove('open');
+
+  toggle.addEventListener('click', openPanel);
+  closeBtn.addEventListener('click', closePanel);
+
+  form.addEventListener('submit', async (e) => {
+    e.preventDefault();
+    const text = (input.value || '').trim();
+    if (!text) return;
+    addMessage('user', text);
+    input.value = '';
+    setLoading(true);
+    try {
+      const res = await fetch(panel.dataset.endpoint, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ message: text })
+      });
+      const data = await res.json();
+      if (!res.ok || data.error) {
+        addMessage('bot', data.error || 'Something went wrong.');
+      } else {
+        addMessage('bot', data.reply || '');
+      }
+    } catch (err) {
+      addMessage('bot', 'Network error.');
+    } finally {
+      setLoading(false);
+      input.focus();
+    }
+  });
+})();
@@ -0,0 +1,21 @@
+// Infinite scroll for the recognition feed.
+(() => {
+  // Replace the "Older" link with the next page when it scrolls into view;
+  // the link still works as plain pagination without JavaScript.
+  const feed = document.getElementById('recognition-feed');
+  if (!('IntersectionObserver' in window)) return;
+  const observer = new IntersectionObserver(async (entries) => {
+    for (const entry of entries) {
+      if (!entry.isIntersecting) continue;
+      const link = entry.target;
+      observer.unobserve(link);
+      const res = await fetch(link.dataset.partial, { headers: { 'X-Requested-With': 'fetch' } });
+      if (!res.ok) return;
+      link.insertAdjacentHTML('afterend', await res.text());
+      link.remove();
+      watch();
+    }
+  }, { rootMargin: '200px' });
+  const watch = () => feed.querySelectorAll('.feed-more').forEach((link) => observer.observe(link));
+  watch();
+})();